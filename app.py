@@ -1,32 +1,63 @@
-import os
+import io
 import time
+import base64
 import threading
-import queue
-import json
-import sqlite3
-from datetime import datetime, timedelta
-import platform
-import subprocess
-import tempfile
-from pathlib import Path
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import logging
 import tkinter as tk
-from tkinter import messagebox, filedialog
 import customtkinter as ctk
-from PIL import Image, ImageTk
-import io
-import base64
-import logging
-from dotenv import load_dotenv
-import pystray
-from PIL import Image as PILImage, ImageDraw
-from difflib import SequenceMatcher
 
 # Import our modules
 from screen_capture import ScreenCapture
 from claude_integration import ClaudeIntegration
-from input_monitor import InputMonitor
 from memory_system import SmartMemorySystem
-from task_executor import TaskExecutor
+from screen_diff import ScreenDiff, normalize_whitespace, text_ratio
+
+# Message passed from worker threads to the Tk thread via message_queue.
+# type is "status", "key_points_start", "key_points_delta", "key_points_end",
+# "insight" or "analysis_state"
+Msg = namedtuple("Msg", "type text color insight context busy", defaults=(None, None, None, None, None))
+
+# 64x64 PNG tray icon (white square on blue), pre-rendered so startup
+# doesn't have to draw it, and decoded once at import
+TRAY_ICON_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAEAAAABACAIAAAAlC+aJAAAAUklEQVR42u3aQQ0AAAgDMWQjFD9gA0iX"
+    "M9D/IrJuBwAAAAAA8BjQOwYAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAOBuAwAAAABwHzDA"
+    "2iMYSKhWKgAAAABJRU5ErkJggg=="
+)
+
+# Bounds for the UI message-pump interval (milliseconds)
+MIN_POLL_DELAY_MS = 10
+MAX_POLL_DELAY_MS = 250
+
+# Most worker messages handled in one UI tick
+MAX_MESSAGES_PER_TICK = 100
+
+# Most messages waiting for the UI; beyond this the oldest are dropped
+MAX_QUEUED_MESSAGES = 64
+
+# Message types dropped first when the queue is full. Each status replaces
+# the previous one anyway, and streamed deltas are superseded by the
+# key_points_end message that carries the full text
+DROPPABLE_MESSAGE_TYPES = ("status", "key_points_delta")
+
+# Knowledge library date filters and how far back each reaches (seconds)
+DATE_FILTER_WINDOWS = {
+    "Today": 86400,  # 24 hours
+    "Last Week": 604800,  # 7 days
+    "Last Month": 2592000,  # 30 days
+}
+
+# In economy mode, screens with a lower share of letters/digits are skipped
+MIN_TEXT_RATIO = 0.3
+
+# Quiet period before a filter change reloads a list (milliseconds)
+FILTER_DEBOUNCE_MS = 150
+
+# Pause in typing before the knowledge library search runs (milliseconds)
+SEARCH_DEBOUNCE_MS = 250
 
 class ScreenMateApp(ctk.CTk):
     def __init__(self):
@@ -38,18 +69,75 @@ class ScreenMateApp(ctk.CTk):
         self.screen_capture = ScreenCapture()
         self.claude = ClaudeIntegration()
         
-        # Message queue for thread communication
-        self.message_queue = queue.Queue()
+        # Single background worker for SQLite writes, so the Tk thread never
+        # waits on a commit. One worker keeps the writes in order
+        self._io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-io")
+        
+        # Message queue for thread communication. Workers append and only the
+        # Tk thread pops, so a deque's atomic append/popleft is enough.
+        # Bounded by _enqueue so a stalled UI can't let it grow forever
+        self.message_queue = deque()
+        self._poll_delay = MIN_POLL_DELAY_MS
         
         # Analysis settings
         self.analysis_interval = 15  # seconds
         self.analyzing = False
         self.monitoring = False
         
+        # Tile hashes and text fingerprint of the last analyzed screen, used to
+        # skip unchanged screens (tiles before OCR, text after)
+        self.last_tile_hashes = None
+        self.screen_diff = ScreenDiff()
+        
+        # Last values pushed to the widgets, so identical updates can be skipped
+        self._last_rendered_key_points = None
+        self._status_text = None
+        self._status_color = None
+        
+        # Held while an analysis runs so button/tray/loop triggers can't overlap
+        self._analysis_lock = threading.Lock()
+        
+        # One persistent monitoring worker: it runs while _run_event is set,
+        # and _wake_event interrupts its between-analysis wait (on stop or
+        # when the interval changes) so it can re-check its deadline
+        self._run_event = threading.Event()
+        self._wake_event = threading.Event()
+        
+        # Bumped when monitoring stops; analyses started under an older
+        # generation drop their results instead of posting them
+        self._generation = 0
+        
+        # Pending after() ids for debounced filter reloads
+        self._filter_after_id = None
+        self._journal_filter_after_id = None
+        self._search_after_id = None
+        
+        # Insights shown in the knowledge library textbox, by text tag, and
+        # the tags in display order
+        self._insights_by_tag = {}
+        self._insight_order = []
+        
+        # Pooled journal row widgets, reconfigured on reload instead of rebuilt
+        self._journal_rows = []
+        self._journal_rows_shown = 0
+        
         # Setup UI
         self.title("ScreenMate - Knowledge Library")
         self.geometry("800x600")
         
+        # Shared fonts, created once and reused by every widget
+        self.title_font = ctk.CTkFont(size=20, weight="bold")
+        self.header_font = ctk.CTkFont(size=16, weight="bold")
+        self.indicator_font = ctk.CTkFont(size=16)
+        self.status_font = ctk.CTkFont(size=12)
+        
+        # Configure the theme
+        ctk.set_appearance_mode("System")
+        ctk.set_default_color_theme("blue")
+        
+        # Status bar above the tabs
+        self._setup_status_bar()
+        
         # Create tab view
         self.tabview = ctk.CTkTabview(self)
         self.tabview.pack(fill="both", expand=True, padx=10, pady=10)
@@ -67,50 +155,91 @@ class ScreenMateApp(ctk.CTk):
         self._setup_settings_tab()
         
         # Setup system tray
+        self._tray_image = None
         self._setup_system_tray()
         
+        # Start the monitoring worker; it idles until monitoring is switched on
+        threading.Thread(target=self._analysis_loop, daemon=True).start()
+        
         # Start message processing
         self._process_messages()
 
     def _process_messages(self):
         """Process messages from the analysis thread"""
+        processed = 0
+        to_save = []
+        # Only the newest key points and status are drawn; older ones in the
+        # same tick would be overwritten before the screen repaints anyway
+        latest_key_points = None
+        # Streamed key points: whether a new stream began this tick, and the
+        # chunks received since
+        restart_key_points = False
+        key_points_chunks = []
+        latest_status = None
+        latest_color = None
+        insights = []
         try:
-            while True:
-                message = self.message_queue.get_nowait()
-                if message["type"] == "status":
-                    self.status_label.configure(text=message["text"])
-                    if "color" in message:
-                        self.status_indicator.configure(text_color=message["color"])
-                elif message["type"] == "key_points":
-                    self._update_key_points(message["text"])
-                    # Save insights to memory system when received
-                    self._save_insight_to_memory(message["text"], message.get("context", ""))
-                elif message["type"] == "insight":
-                    self._add_insight_to_list(message["insight"])
-        except queue.Empty:
-            pass
+            # Cap the work per tick so a burst can't stall the Tk event loop;
+            # anything left over is picked up on the next (immediate) tick
+            while self.message_queue and processed < MAX_MESSAGES_PER_TICK:
+                message = self.message_queue.popleft()
+                processed += 1
+                kind = message.type
+                if kind == "status":
+                    latest_status = message.text
+                    # Colorless updates keep the last color, so track it separately
+                    if message.color is not None:
+                        latest_color = message.color
+                elif kind == "key_points_start":
+                    # A new result supersedes anything before it this tick
+                    latest_key_points = None
+                    key_points_chunks = []
+                    restart_key_points = True
+                elif kind == "key_points_delta":
+                    key_points_chunks.append(message.text)
+                elif kind == "key_points_end":
+                    latest_key_points = message.text
+                    key_points_chunks = []
+                    restart_key_points = False
+                    # Save insights to memory system once the queue is drained
+                    to_save.append((message.text, message.context or ""))
+                elif kind == "insight":
+                    insights.append(message.insight)
+                elif kind == "analysis_state":
+                    self.analyze_now_button.configure(state="disabled" if message.busy else "normal")
+            
+            if insights:
+                self._add_insights_bulk(insights)
+            if latest_key_points is not None:
+                self._update_key_points(latest_key_points)
+            if restart_key_points:
+                self._update_key_points("")
+            if key_points_chunks:
+                self._append_key_points("".join(key_points_chunks))
+            if latest_status is not None:
+                self._set_status(latest_status, latest_color)
+            
+            # Persist everything received this tick off the Tk thread
+            if to_save:
+                self._io_executor.submit(self._save_insights, to_save)
         finally:
-            self.after(100, self._process_messages)
+            # Poll quickly while messages are flowing, back off when idle
+            if processed:
+                self._poll_delay = MIN_POLL_DELAY_MS
+            else:
+                self._poll_delay = min(self._poll_delay * 2, MAX_POLL_DELAY_MS)
+            self.after(self._poll_delay, self._process_messages)
 
-    def _setup_ui(self):
-        """Set up the UI with tabs including Knowledge Library"""
-        # Configure the theme
-        ctk.set_appearance_mode("System")
-        ctk.set_default_color_theme("blue")
-        
-        # Main frame
-        main_frame = ctk.CTkFrame(self)
-        main_frame.pack(fill="both", expand=True, padx=10, pady=10)
-        
-        # Status frame - at the top
-        status_frame = ctk.CTkFrame(main_frame, fg_color="transparent", height=30)
-        status_frame.pack(fill="x", pady=(0, 5))
+    def _setup_status_bar(self):
+        """Set up the title and status indicator shown above the tabs"""
+        status_frame = ctk.CTkFrame(self, fg_color="transparent", height=30)
+        status_frame.pack(fill="x", padx=10, pady=(10, 0))
         
         # Title
         title_label = ctk.CTkLabel(
             status_frame,
             text="ScreenMate",
-            font=ctk.CTkFont(size=20, weight="bold")
+            font=self.title_font
         )
         title_label.pack(side="left", padx=(10, 0))
         
@@ -118,7 +247,7 @@ class ScreenMateApp(ctk.CTk):
         self.status_indicator = ctk.CTkLabel(
             status_frame,
             text="●",
-            font=ctk.CTkFont(size=16),
+            font=self.indicator_font,
             text_color="red"
         )
         self.status_indicator.pack(side="left", padx=(10, 5))
@@ -126,31 +255,27 @@ class ScreenMateApp(ctk.CTk):
         self.status_label = ctk.CTkLabel(
             status_frame,
             text="Inactive",
-            font=ctk.CTkFont(size=12)
+            font=self.status_font
         )
         self.status_label.pack(side="left")
-        
-        # Create tabview
-        self.tabview = ctk.CTkTabview(main_frame)
-        self.tabview.pack(fill="both", expand=True, padx=5, pady=5)
-        
-        # Add tabs
-        self.tab_key_points = self.tabview.add("Key Points")
-        self.tab_knowledge = self.tabview.add("Knowledge Library")
-        self.tab_settings = self.tabview.add("Settings")
-        
-        # Set up each tab
-        self._setup_key_points_tab()
-        self._setup_knowledge_library_tab()
-        self._setup_settings_tab()
 
     def _setup_system_tray(self):
         """Set up system tray icon for easy access"""
-        # Create a simple icon
-        icon_size = (64, 64)
-        icon_image = PILImage.new('RGB', icon_size, color=(0, 120, 212))
-        draw = ImageDraw.Draw(icon_image)
-        draw.rectangle((10, 10, 54, 54), fill=(255, 255, 255))
+        # Only needed here, so keep them off the startup import path
+        try:
+            import pystray
+            from PIL import Image as PILImage
+        except ImportError as e:
+            # The tray is a convenience; run without it rather than fail
+            logging.warning(f"System tray disabled: {str(e)}")
+            self.tray_icon = None
+            return
+        
+        # Decode the PNG once and share the image if the tray is rebuilt
+        if self._tray_image is None:
+            self._tray_image = PILImage.open(io.BytesIO(TRAY_ICON_PNG))
+            self._tray_image.load()
+        icon_image = self._tray_image
         
         # Create system tray menu
         menu = (
@@ -176,111 +301,200 @@ class ScreenMateApp(ctk.CTk):
         """Quit the application"""
         if self.tray_icon:
             self.tray_icon.stop()
+        self.screen_capture.shutdown()
+        # Let queued insight writes finish before exiting
+        self._io_executor.shutdown(wait=True)
         self.quit()
     
     def _toggle_monitoring(self):
         """Toggle continuous monitoring"""
         if self.analyzing:
             self.analyzing = False
+            # Invalidate any analysis still in flight
+            self._generation += 1
+            self._run_event.clear()
+            self._wake_event.set()
             self.start_button.configure(text="Start Monitoring")
-            self.status_indicator.configure(text_color="red")
-            self.status_label.configure(text="Inactive")
+            self._set_status("Inactive", "red")
         else:
             self.analyzing = True
             self.start_button.configure(text="Stop Monitoring")
-            self.status_indicator.configure(text_color="green")
-            self.status_label.configure(text="Active")
-            self._start_analysis_thread()
+            self._set_status("Active", "green")
+            self._run_event.set()
     
     def _analyze_once(self):
-        """Perform a one-time analysis"""
-        self._perform_analysis()
-    
-    def _start_analysis_thread(self):
-        """Start the analysis thread"""
-        if self.analysis_thread and self.analysis_thread.is_alive():
+        """Perform a one-time analysis in the background"""
+        # Ignore repeated clicks or tray selections while an analysis is running
+        if self._analysis_lock.locked():
             return
-        
-        self.analysis_thread = threading.Thread(target=self._analysis_loop, daemon=True)
-        self.analysis_thread.start()
+        threading.Thread(target=self._perform_analysis, daemon=True).start()
     
     def _analysis_loop(self):
-        """Continuous analysis loop"""
-        while self.analyzing:
-            current_time = time.time()
-            if current_time - self.last_analysis_time >= self.analysis_interval:
-                self._perform_analysis()
-                self.last_analysis_time = current_time
-            time.sleep(1)
+        """Continuous analysis loop, run by the single monitoring worker"""
+        while True:
+            # Idle here while monitoring is off
+            self._run_event.wait()
+            self._perform_analysis()
+            finished = time.monotonic()
+            
+            # Sleep until the next deadline. A wake-up means monitoring was
+            # stopped or the interval changed, so re-check before sleeping again
+            while self._run_event.is_set():
+                remaining = finished + self.analysis_interval - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._wake_event.wait(remaining)
+                self._wake_event.clear()
     
     def _perform_analysis(self):
-        """Extract key points from the current screen content"""
+        """Run a single analysis unless one is already in progress"""
+        if not self._analysis_lock.acquire(blocking=False):
+            return
+        
+        self._enqueue(Msg("analysis_state", busy=True))
+        try:
+            self._extract_key_points(self._generation)
+        finally:
+            self._analysis_lock.release()
+            self._enqueue(Msg("analysis_state", busy=False))
+    
+    def _extract_key_points(self, generation):
+        """Extract key points from the current screen content
+        
+        Args:
+            generation: Value of _generation when this analysis started; if
+                monitoring is stopped meanwhile, results are discarded
+        """
         try:
             # Update status
-            self.message_queue.put({"type": "status", "text": "Analyzing..."})
+            self._post(generation, Msg("status", "Analyzing..."))
+            
+            # Capture screen and extract text, unless the pixels barely changed
+            screen_data = self.screen_capture.analyze_screen(self.last_tile_hashes)
             
-            # Capture screen and extract text
-            screen_data = self.screen_capture.analyze_screen()
+            if screen_data and screen_data["unchanged"]:
+                self._post(generation, Msg("status", "Content unchanged" if not self.analyzing else "Active"))
+                return
+            
+            # OCR ran, so these tiles are the new reference
+            if screen_data:
+                self.last_tile_hashes = screen_data["tile_hashes"]
+            
+            # Normalize once; everything below works on the same text
+            text = normalize_whitespace(screen_data["text"] or "") if screen_data else ""
+            
+            if len(text) < 50:
+                self._post(generation, Msg("status", "Not enough text to analyze" if not self.analyzing else "Active"))
+                return
             
-            if not screen_data or not screen_data["text"] or len(screen_data["text"]) < 50:
-                self.message_queue.put({
-                    "type": "status",
-                    "text": "Not enough text to analyze" if not self.analyzing else "Active"
-                })
+            # In economy mode, don't spend time on screens that are mostly noise
+            economy = self.economy_mode_var.get()
+            if economy and text_ratio(text) < MIN_TEXT_RATIO:
+                self._post(generation, Msg("status", "Not enough text to analyze" if not self.analyzing else "Active"))
                 return
             
             # Check if content has changed significantly
-            if hasattr(self, 'last_screen_text'):
-                similarity = SequenceMatcher(None, self.last_screen_text, screen_data["text"]).ratio()
-                
-                if similarity > 0.9:
-                    self.message_queue.put({
-                        "type": "status",
-                        "text": "Content unchanged" if not self.analyzing else "Active"
-                    })
-                    return
+            if self.screen_diff.is_unchanged(text):
+                self._post(generation, Msg("status", "Content unchanged" if not self.analyzing else "Active"))
+                return
             
-            # Save current text for future comparison
-            self.last_screen_text = screen_data["text"]
+            # Monitoring was stopped during OCR; don't pay for a Claude call
+            if generation != self._generation:
+                return
             
-            # Get key points
-            use_api = not self.economy_mode_var.get()
-            key_points = self.claude.get_key_points(screen_data["text"], use_api=use_api)
+            # Stream key points to the UI as Claude generates them
+            use_api = not economy
+            self._post(generation, Msg("key_points_start"))
+            chunks = []
+            stream = self.claude.iter_key_points(text, use_api=use_api)
+            try:
+                for chunk in stream:
+                    if generation != self._generation:
+                        break
+                    chunks.append(chunk)
+                    self._post(generation, Msg("key_points_delta", chunk))
+            finally:
+                # Stops the API stream if monitoring was stopped mid-answer
+                stream.close()
             
-            # Update UI with results
-            self.message_queue.put({
-                "type": "key_points",
-                "text": key_points
-            })
+            # The complete text replaces the streamed one and gets saved
+            self._post(generation, Msg("key_points_end", "".join(chunks)))
             
-            self.message_queue.put({
-                "type": "status",
-                "text": "Active" if self.analyzing else "Analysis complete",
-                "color": "green" if self.analyzing else "blue"
-            })
+            self._post(generation, Msg(
+                "status",
+                "Active" if self.analyzing else "Analysis complete",
+                "green" if self.analyzing else "blue"
+            ))
             
         except Exception as e:
             logging.error(f"Analysis error: {str(e)}")
-            self.message_queue.put({
-                "type": "status",
-                "text": f"Error: {str(e)}",
-                "color": "red"
-            })
+            self._post(generation, Msg(
+                "status",
+                f"Error: {str(e)}",
+                "red"
+            ))
+    
+    def _post(self, generation, message):
+        """Queue a message for the UI unless its analysis has gone stale"""
+        if generation == self._generation:
+            self._enqueue(message)
+    
+    def _enqueue(self, message):
+        """Queue a message for the UI, dropping the oldest one if it's full
+        
+        Statuses and streamed deltas go first, so results and state changes
+        survive a stalled UI.
+        """
+        queue = self.message_queue
+        if len(queue) >= MAX_QUEUED_MESSAGES:
+            # Snapshot first: the Tk thread may pop while we look
+            pending = list(queue)
+            victim = next(
+                (m for kind in DROPPABLE_MESSAGE_TYPES for m in pending if m.type == kind),
+                pending[0] if pending else None,
+            )
+            if victim is not None:
+                try:
+                    queue.remove(victim)
+                except ValueError:
+                    pass  # Already handled by the UI
+        queue.append(message)
+    
+    def _set_status(self, text, color=None):
+        """Update the status label and indicator, skipping no-op redraws"""
+        if text != self._status_text:
+            self.status_label.configure(text=text)
+            self._status_text = text
+        if color is not None and color != self._status_color:
+            self.status_indicator.configure(text_color=color)
+            self._status_color = color
     
     def _update_key_points(self, text):
         """Update the key points text box"""
+        # Re-rendering the text widget is expensive; skip identical results
+        if text == self._last_rendered_key_points:
+            return
+        self._last_rendered_key_points = text
+        
         self.key_points_text.configure(state="normal")
         self.key_points_text.delete("1.0", "end")
         self.key_points_text.insert("1.0", text)
         self.key_points_text.configure(state="disabled")
 
+    def _append_key_points(self, text):
+        """Append streamed text to the key points text box"""
+        self.key_points_text.configure(state="normal")
+        self.key_points_text.insert("end", text)
+        self.key_points_text.configure(state="disabled")
+        self._last_rendered_key_points = (self._last_rendered_key_points or "") + text
+
     def _setup_key_points_tab(self):
         """Set up the Key Points tab"""
         # Key Points section
         key_points_label = ctk.CTkLabel(
             self.key_points_tab,
             text="Key Points:",
-            font=ctk.CTkFont(size=16, weight="bold")
+            font=self.header_font
         )
         key_points_label.pack(anchor="w", padx=10, pady=(10, 5))
         
@@ -319,22 +533,11 @@ class ScreenMateApp(ctk.CTk):
             variable=self.economy_mode_var
         )
         economy_switch.pack(anchor="w", padx=20, pady=10)
-        
-        # Interval setting
-        interval_frame = ctk.CTkFrame(settings_frame)
-        interval_frame.pack(fill="x", padx=10, pady=(0, 10))
-        
-        interval_label = ctk.CTkLabel(interval_frame, text="Capture Interval (seconds):")
-        interval_label.pack(side="left", padx=(10, 10))
-        
-        self.interval_entry = ctk.CTkEntry(interval_frame, width=60)
-        self.interval_entry.pack(side="left")
-        self.interval_entry.insert(0, "15")  # Longer default interval to reduce API costs
 
-    def _setup_knowledge_library_tab(self):
+    def _setup_knowledge_tab(self):
         """Set up the Knowledge Library tab"""
         # Search frame
-        search_frame = ctk.CTkFrame(self.tab_knowledge)
+        search_frame = ctk.CTkFrame(self.knowledge_tab)
         search_frame.pack(fill="x", padx=10, pady=5)
         
         self.search_entry = ctk.CTkEntry(
@@ -344,6 +547,9 @@ class ScreenMateApp(ctk.CTk):
         )
         self.search_entry.pack(side="left", padx=5)
         
+        # Live search as the user types, debounced to one query per pause
+        self.search_entry.bind("<KeyRelease>", self._schedule_search)
+        
         self.search_button = ctk.CTkButton(
             search_frame,
             text="Search",
@@ -352,7 +558,7 @@ class ScreenMateApp(ctk.CTk):
         self.search_button.pack(side="left", padx=5)
         
         # Filter frame
-        filter_frame = ctk.CTkFrame(self.tab_knowledge)
+        filter_frame = ctk.CTkFrame(self.knowledge_tab)
         filter_frame.pack(fill="x", padx=10, pady=5)
         
         # Category filter
@@ -375,30 +581,39 @@ class ScreenMateApp(ctk.CTk):
         )
         self.date_menu.pack(side="left", padx=5)
         
-        # Insights list
-        self.insights_frame = ctk.CTkScrollableFrame(
-            self.tab_knowledge,
+        # Insights list: one read-only textbox, each insight a tagged text
+        # range, instead of a frame of widgets per insight
+        self.insights_textbox = ctk.CTkTextbox(
+            self.knowledge_tab,
             width=700,
-            height=400
+            height=400,
+            wrap="word"
         )
-        self.insights_frame.pack(pady=10, padx=10)
+        self.insights_textbox.pack(pady=10, padx=10)
+        self.insights_textbox.configure(state="disabled")
+        
+        # Clicking an insight offers Edit/Delete
+        self.insights_textbox.tag_bind("insight", "<Button-1>", self._on_insight_click)
+        self.insight_menu = tk.Menu(self, tearoff=0)
+        self.insight_menu.add_command(label="Edit", command=lambda: self._act_on_clicked_insight(self._edit_insight))
+        self.insight_menu.add_command(label="Delete", command=lambda: self._act_on_clicked_insight(self._delete_insight))
+        self._clicked_insight = None
         
         # Load initial insights
         self._load_insights()
 
     def _setup_settings_tab(self):
         """Set up the Settings tab"""
-        # Economy mode
-        self.economy_var = ctk.BooleanVar(value=True)
+        # Economy mode, shared with the switch on the Key Points tab
         self.economy_check = ctk.CTkCheckBox(
-            self.tab_settings,
+            self.settings_tab,
             text="Economy Mode (Use local processing when possible)",
-            variable=self.economy_var
+            variable=self.economy_mode_var
         )
         self.economy_check.pack(pady=10)
         
         # Analysis interval
-        interval_frame = ctk.CTkFrame(self.tab_settings)
+        interval_frame = ctk.CTkFrame(self.settings_tab)
         interval_frame.pack(pady=10)
         
         ctk.CTkLabel(
@@ -415,98 +630,150 @@ class ScreenMateApp(ctk.CTk):
         
         # Save button
         self.save_button = ctk.CTkButton(
-            self.tab_settings,
+            self.settings_tab,
             text="Save Settings",
             command=self._save_settings
         )
         self.save_button.pack(pady=10)
 
-    def _load_saved_insights(self):
-        """Load saved insights from the memory system"""
-        # Implementation of loading saved insights
-        pass
+    def _save_insights(self, items):
+        """Save (insight, context) pairs in a single transaction (runs on the I/O worker)"""
+        try:
+            with self.memory_system.batch():
+                for text, context in items:
+                    self._save_insight_to_memory(text, context)
+        except Exception as e:
+            logging.error(f"Error saving insights: {str(e)}")
 
     def _save_insight_to_memory(self, insight, context):
         """Save an insight to the memory system"""
-        # Implementation of saving an insight to the memory system
-        pass
+        self.memory_system.store_insight(
+            content=insight,
+            source="key_points",
+            context=context,
+            topics=self.memory_system.extract_topics_local(insight) or ["General"],
+            defer=True
+        )
 
     def _add_insight_to_list(self, insight):
-        """Add an insight to the list"""
-        # Create frame for insight
-        insight_frame = ctk.CTkFrame(self.insights_frame)
-        insight_frame.pack(fill="x", pady=5, padx=5)
-        
-        # Content
-        content_label = ctk.CTkLabel(
-            insight_frame,
-            text=insight["content"][:100] + "...",
-            wraplength=600
-        )
-        content_label.pack(pady=5)
-        
-        # Metadata frame
-        meta_frame = ctk.CTkFrame(insight_frame)
-        meta_frame.pack(fill="x", pady=5)
-        
-        # Date
+        """Append an insight to the list"""
+        self._add_insights_bulk([insight])
+
+    def _add_insights_bulk(self, insights):
+        """Append several insights to the list in one textbox edit"""
+        self.insights_textbox.configure(state="normal")
+        for insight in insights:
+            tag = self._insight_tag(insight)
+            if tag in self._insights_by_tag:
+                self._remove_insight_text(tag)
+            self._insert_insight(insight, "end")
+            self._insight_order.append(tag)
+        self.insights_textbox.configure(state="disabled")
+
+    def _insight_tag(self, insight):
+        """Text tag marking an insight's block in the textbox"""
+        return f"insight-{insight['id']}"
+
+    def _insert_insight(self, insight, index):
+        """Insert an insight's text block at index in the (editable) textbox"""
         date = datetime.fromtimestamp(insight["timestamp"])
-        date_label = ctk.CTkLabel(
-            meta_frame,
-            text=date.strftime("%Y-%m-%d %H:%M")
-        )
-        date_label.pack(side="left", padx=5)
-        
-        # Source
-        source_label = ctk.CTkLabel(
-            meta_frame,
-            text=f"Source: {insight['source']}"
-        )
-        source_label.pack(side="left", padx=5)
-        
-        # Topics
+        meta = f"{date.strftime('%Y-%m-%d %H:%M')} | Source: {insight['source']}"
         topics = insight.get("topics", [])
         if topics:
-            topics_label = ctk.CTkLabel(
-                meta_frame,
-                text=f"Topics: {', '.join(topics)}"
-            )
-            topics_label.pack(side="left", padx=5)
+            meta += f" | Topics: {', '.join(topics)}"
         
-        # Action buttons
-        action_frame = ctk.CTkFrame(insight_frame)
-        action_frame.pack(fill="x", pady=5)
+        tag = self._insight_tag(insight)
+        self._insights_by_tag[tag] = insight
+        self.insights_textbox.insert(index, f"{insight['content'][:100]}...\n{meta}\n\n", ("insight", tag))
+
+    def _remove_insight_text(self, tag):
+        """Delete an insight's block from the (editable) textbox"""
+        self.insights_textbox.delete(f"{tag}.first", f"{tag}.last")
+        del self._insights_by_tag[tag]
+        self._insight_order.remove(tag)
+
+    def _show_insights(self, insights):
+        """Make the list show exactly the given insights, in order
         
-        edit_button = ctk.CTkButton(
-            action_frame,
-            text="Edit",
-            command=lambda i=insight: self._edit_insight(i)
-        )
-        edit_button.pack(side="left", padx=5)
+        Diffs against what is already shown by insight id, so a filter
+        change only deletes the insights that left and inserts the ones
+        that arrived (or changed).
+        """
+        wanted = {self._insight_tag(insight): insight for insight in insights}
         
-        delete_button = ctk.CTkButton(
-            action_frame,
-            text="Delete",
-            command=lambda i=insight: self._delete_insight(i)
-        )
-        delete_button.pack(side="left", padx=5)
+        self.insights_textbox.configure(state="normal")
+        
+        # Drop insights that are gone or whose contents changed
+        for tag in list(self._insight_order):
+            if wanted.get(tag) != self._insights_by_tag[tag]:
+                self._remove_insight_text(tag)
+        
+        # Walk the wanted order against what remains, inserting where needed
+        position = 0
+        for insight in insights:
+            tag = self._insight_tag(insight)
+            if position < len(self._insight_order) and self._insight_order[position] == tag:
+                position += 1
+                continue
+            if tag in self._insights_by_tag:
+                # Shown, but out of order: move it
+                self._remove_insight_text(tag)
+            if position < len(self._insight_order):
+                index = self.insights_textbox.index(f"{self._insight_order[position]}.first")
+            else:
+                index = "end"
+            self._insert_insight(insight, index)
+            self._insight_order.insert(position, tag)
+            position += 1
+        
+        self.insights_textbox.configure(state="disabled")
 
+    def _on_insight_click(self, event):
+        """Open the Edit/Delete menu for the insight under the pointer"""
+        index = self.insights_textbox.index(f"@{event.x},{event.y}")
+        for tag in self.insights_textbox.tag_names(index):
+            if tag in self._insights_by_tag:
+                self._clicked_insight = self._insights_by_tag[tag]
+                self.insight_menu.tk_popup(event.x_root, event.y_root)
+                break
+
+    def _act_on_clicked_insight(self, action):
+        """Run an Edit/Delete menu action on the insight that was clicked"""
+        insight, self._clicked_insight = self._clicked_insight, None
+        if insight is not None:
+            action(insight)
+
+    def _schedule_search(self, _=None):
+        """Run _search_insights once typing has paused for SEARCH_DEBOUNCE_MS"""
+        if self._search_after_id:
+            self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(SEARCH_DEBOUNCE_MS, self._search_insights)
+    
     def _search_insights(self):
         """Search insights"""
+        # A button click supersedes any pending debounced search
+        if self._search_after_id:
+            self.after_cancel(self._search_after_id)
+            self._search_after_id = None
+        
         query = self.search_entry.get()
         if query:
             insights = self.memory_system.search_memories(query)
-            
-            # Clear current insights
-            for widget in self.insights_frame.winfo_children():
-                widget.destroy()
-            
-            # Add search results
-            for insight in insights:
-                self._add_insight_to_list(insight)
+            self._show_insights(insights)
 
     def _filter_insights(self, _=None):
-        """Filter insights based on current settings"""
+        """Filter insights based on current settings
+        
+        Reloads are debounced so a burst of filter changes only rebuilds
+        the list once.
+        """
+        if self._filter_after_id:
+            self.after_cancel(self._filter_after_id)
+        self._filter_after_id = self.after(FILTER_DEBOUNCE_MS, self._do_filter_insights)
+
+    def _do_filter_insights(self):
+        """Run the debounced insights reload"""
+        self._filter_after_id = None
         self._load_insights()
 
     def _edit_insight(self, insight):
@@ -574,36 +841,30 @@ class ScreenMateApp(ctk.CTk):
             # Update analysis interval
             interval = int(self.interval_entry.get())
             if interval >= 5:  # Minimum 5 seconds
-                self.analysis_interval = interval
-                self.status_label.configure(text="Settings saved successfully")
+                if interval != self.analysis_interval:
+                    self.analysis_interval = interval
+                    # Let a sleeping monitoring worker pick up the new interval now
+                    self._wake_event.set()
+                self._set_status("Settings saved successfully")
             else:
-                self.status_label.configure(text="Interval must be at least 5 seconds")
+                self._set_status("Interval must be at least 5 seconds")
         except ValueError:
-            self.status_label.configure(text="Invalid interval value")
+            self._set_status("Invalid interval value")
 
     def _load_insights(self):
         """Load insights into the list"""
-        # Clear current insights
-        for widget in self.insights_frame.winfo_children():
-            widget.destroy()
-        
         # Get insights based on current filters
         insights = self._get_filtered_insights()
-        
-        # Add insights to list
-        for insight in insights:
-            self._add_insight_to_list(insight)
+        self._show_insights(insights)
 
     def _get_filtered_insights(self):
         """Get insights based on current filters"""
-        # Get date range
+        # Get date range, measured from the start of the current minute so
+        # repeated filter clicks send SQLite the same parameters
         date_range = None
-        if self.date_var.get() == "Today":
-            date_range = time.time() - 86400  # 24 hours
-        elif self.date_var.get() == "Last Week":
-            date_range = time.time() - 604800  # 7 days
-        elif self.date_var.get() == "Last Month":
-            date_range = time.time() - 2592000  # 30 days
+        window = DATE_FILTER_WINDOWS.get(self.date_var.get())
+        if window:
+            date_range = int(time.time() // 60) * 60 - window
         
         # Get category
         category = None
@@ -729,22 +990,22 @@ class ScreenMateApp(ctk.CTk):
                 self._load_journal_entries()
                 
                 # Show success message
-                self.status_label.configure(text="Journal entry saved successfully")
+                self._set_status("Journal entry saved successfully")
             else:
-                self.status_label.configure(text="Error saving journal entry")
+                self._set_status("Error saving journal entry")
 
     def _load_journal_entries(self):
         """Load journal entries into the list"""
-        # Clear current entries
-        for widget in self.journal_entries_frame.winfo_children():
-            widget.destroy()
-        
         # Get entries based on current filters
         entries = self._get_filtered_journal_entries()
         
-        # Add entries to list
+        self._journal_rows_shown = 0
         for entry in entries:
             self._add_journal_entry_to_list(entry)
+        
+        # Hide rows left over from a longer previous list
+        for row in self._journal_rows[self._journal_rows_shown:]:
+            row["frame"].pack_forget()
 
     def _get_filtered_journal_entries(self):
         """Get journal entries based on current filters"""
@@ -763,10 +1024,21 @@ class ScreenMateApp(ctk.CTk):
         )
 
     def _add_journal_entry_to_list(self, entry):
-        """Add a journal entry to the list"""
+        """Add a journal entry to the end of the list, reusing a hidden row if one exists"""
+        if self._journal_rows_shown < len(self._journal_rows):
+            row = self._journal_rows[self._journal_rows_shown]
+        else:
+            row = self._make_journal_row()
+            self._journal_rows.append(row)
+        
+        self._bind_journal_row(row, entry)
+        row["frame"].pack(fill="x", pady=5, padx=5)
+        self._journal_rows_shown += 1
+
+    def _make_journal_row(self):
+        """Create the widgets for one journal row (populated by _bind_journal_row)"""
         # Create frame for entry
         entry_frame = ctk.CTkFrame(self.journal_entries_frame)
-        entry_frame.pack(fill="x", pady=5, padx=5)
         
         # Title and date
         header_frame = ctk.CTkFrame(entry_frame)
@@ -774,63 +1046,66 @@ class ScreenMateApp(ctk.CTk):
         
         title_label = ctk.CTkLabel(
             header_frame,
-            text=entry["title"],
+            text="",
             font=("Helvetica", 12, "bold")
         )
         title_label.pack(side="left", padx=5)
         
-        date = datetime.fromtimestamp(entry["timestamp"])
-        date_label = ctk.CTkLabel(
-            header_frame,
-            text=date.strftime("%Y-%m-%d %H:%M")
-        )
+        date_label = ctk.CTkLabel(header_frame, text="")
         date_label.pack(side="right", padx=5)
         
         # Preview
-        preview_label = ctk.CTkLabel(
-            entry_frame,
-            text=entry["content"][:100] + "...",
-            wraplength=600
-        )
+        preview_label = ctk.CTkLabel(entry_frame, text="", wraplength=600)
         preview_label.pack(pady=5)
         
-        # Metadata frame
+        # Metadata frame; mood and tags are packed only when present
         meta_frame = ctk.CTkFrame(entry_frame)
         meta_frame.pack(fill="x", pady=5)
         
-        # Mood
-        if entry.get("mood"):
-            mood_label = ctk.CTkLabel(
-                meta_frame,
-                text=f"Mood: {entry['mood']}"
-            )
-            mood_label.pack(side="left", padx=5)
-        
-        # Tags
-        if entry.get("tags"):
-            tags_label = ctk.CTkLabel(
-                meta_frame,
-                text=f"Tags: {', '.join(entry['tags'])}"
-            )
-            tags_label.pack(side="left", padx=5)
+        mood_label = ctk.CTkLabel(meta_frame, text="")
+        tags_label = ctk.CTkLabel(meta_frame, text="")
         
         # Action buttons
         action_frame = ctk.CTkFrame(entry_frame)
         action_frame.pack(fill="x", pady=5)
         
-        edit_button = ctk.CTkButton(
-            action_frame,
-            text="Edit",
-            command=lambda e=entry: self._edit_journal_entry(e)
-        )
+        edit_button = ctk.CTkButton(action_frame, text="Edit")
         edit_button.pack(side="left", padx=5)
         
-        delete_button = ctk.CTkButton(
-            action_frame,
-            text="Delete",
-            command=lambda e=entry: self._delete_journal_entry(e)
-        )
+        delete_button = ctk.CTkButton(action_frame, text="Delete")
         delete_button.pack(side="left", padx=5)
+        
+        return {
+            "frame": entry_frame,
+            "title": title_label,
+            "date": date_label,
+            "preview": preview_label,
+            "mood": mood_label,
+            "tags": tags_label,
+            "edit": edit_button,
+            "delete": delete_button,
+        }
+
+    def _bind_journal_row(self, row, entry):
+        """Point an existing journal row at a new entry"""
+        row["title"].configure(text=entry["title"])
+        
+        date = datetime.fromtimestamp(entry["timestamp"])
+        row["date"].configure(text=date.strftime("%Y-%m-%d %H:%M"))
+        row["preview"].configure(text=entry["content"][:100] + "...")
+        
+        # Repack in a fixed order so mood always precedes tags
+        row["mood"].pack_forget()
+        row["tags"].pack_forget()
+        if entry.get("mood"):
+            row["mood"].configure(text=f"Mood: {entry['mood']}")
+            row["mood"].pack(side="left", padx=5)
+        if entry.get("tags"):
+            row["tags"].configure(text=f"Tags: {', '.join(entry['tags'])}")
+            row["tags"].pack(side="left", padx=5)
+        
+        row["edit"].configure(command=lambda e=entry: self._edit_journal_entry(e))
+        row["delete"].configure(command=lambda e=entry: self._delete_journal_entry(e))
 
     def _edit_journal_entry(self, entry):
         """Edit a journal entry"""
@@ -906,13 +1181,16 @@ class ScreenMateApp(ctk.CTk):
             self._load_journal_entries()
 
     def _filter_journal_entries(self, _=None):
-        """Filter journal entries based on current settings"""
+        """Filter journal entries based on current settings (debounced)"""
+        if self._journal_filter_after_id:
+            self.after_cancel(self._journal_filter_after_id)
+        self._journal_filter_after_id = self.after(FILTER_DEBOUNCE_MS, self._do_filter_journal_entries)
+
+    def _do_filter_journal_entries(self):
+        """Run the debounced journal reload"""
+        self._journal_filter_after_id = None
         self._load_journal_entries()
 
     def run(self):
         """Start the application"""
-        self.mainloop()
-
-if __name__ == "__main__":
-    app = ScreenMateApp()
-    app.run() 
\ No newline at end of file
+        self.mainloop()
\ No newline at end of file
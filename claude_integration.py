@@ -1,53 +1,533 @@
 import os
+import re
+import json
 import time
+import atexit
+import threading
+import hashlib
 import logging
+import textwrap
+import importlib.util
+from collections import Counter, OrderedDict, defaultdict, deque
 from typing import Dict, Any, Optional, List
-from anthropic import Anthropic
 from dotenv import load_dotenv
+from screen_diff import (
+    SIMILARITY_WINDOW, fingerprint_similarity, normalize_for_fingerprint, text_fingerprint
+)
 
 load_dotenv()
 
+# Keywords that suggest a sentence is important (local key point extraction)
+IMPORTANT_KEYWORDS = ('must', 'important', 'critical', 'deadline', 'required',
+                      'key', 'essential', 'urgent', 'necessary', 'vital')
+
+# Action verbs that suggest a sentence is a task
+ACTION_VERBS = ('submit', 'complete', 'send', 'prepare', 'review', 'update',
+                'create', 'finish', 'deliver', 'schedule')
+
+# Each keyword set compiled into one alternation, so a sentence is scanned
+# once per set rather than once per keyword. Like the `in` checks they
+# replace, these match anywhere in a word (e.g. "key" in "keyboard")
+_IMPORTANT_RE = re.compile("|".join(map(re.escape, IMPORTANT_KEYWORDS)))
+_ACTION_RE = re.compile("|".join(map(re.escape, ACTION_VERBS)))
+
+# System prompts. Kept byte-identical across calls so Anthropic's prompt
+# cache can reuse the prefix (see _system_blocks)
+SCREENMATE_SYSTEM = "You are ScreenMate, an AI assistant that helps users understand what they're working on."
+INSIGHTS_SYSTEM = SCREENMATE_SYSTEM + " Provide brief, focused insights that would be most helpful given what's visible on screen. Don't explain what ScreenMate is - just provide the insights directly."
+KEY_POINTS_SYSTEM = "You extract key points from text. Be concise and highlight only the most important information."
+ANSWER_SYSTEM = SCREENMATE_SYSTEM + " Provide clear, concise answers to questions about the screen content."
+DAILY_SUMMARY_SYSTEM = """You will be given today's insights, already grouped by topic. Create a concise, well-organized summary that:
+1. Highlights the most important information from each topic
+2. Presents any action items or key takeaways
+3. Is brief but comprehensive
+
+Format the summary with clear headings and bullet points."""
+INSIGHTS_AND_KEY_POINTS_SYSTEM = SCREENMATE_SYSTEM + " Reply with a single JSON object and nothing else."
+TOPIC_SUMMARY_SYSTEM = """You will be given today's insights on a single topic. Summarize them in a few bullet points, highlighting the most important information and any action items or key takeaways."""
+
+# User prompt templates, dedented once at import
+INSIGHTS_PROMPT = textwrap.dedent("""\
+    I'm looking at my screen which contains the following text:
+    
+    {screen_text}
+    
+    Based on this information, what are 1-3 key insights or helpful observations you can provide?
+    Focus on what might be most helpful to know right now given what I'm working on.
+    Keep your response brief and focused.
+    """)
+CONTEXT_INSIGHT_PROMPT = textwrap.dedent("""\
+    Analyze this screen content and user context to provide insights:
+    
+    Screen Content:
+    {screen_text}
+    
+    User Context:
+    Current App: {app_name}
+    Recent Activity: {recent_activity}
+    
+    Provide a brief, actionable insight about what the user is doing and any relevant suggestions.
+    Focus on productivity and workflow improvements.
+    """)
+ANSWER_PROMPT = textwrap.dedent("""\
+    Based on the following screen content:
+    
+    {screen_text}
+    
+    Please answer this question: {question}
+    
+    Keep your response brief and focused on the question.
+    """)
+KEY_POINTS_PROMPT = textwrap.dedent("""\
+    Extract the 3-5 most important points and any action items from this content:
+    
+    {screen_text}
+    
+    Format your response as a bulleted list. For action items, add "(ACTION ITEM)" at the end.
+    Focus on deadlines, key decisions, important facts, and required actions.
+    Be concise and clear.
+    """)
+INSIGHTS_AND_KEY_POINTS_PROMPT = textwrap.dedent("""\
+    I'm looking at my screen which contains the following text:
+    
+    {screen_text}
+    
+    Return JSON of the form {{"insights": [...], "key_points": [...], "action_items": [...]}} where:
+    - insights holds 1-3 brief insights or helpful observations about what I'm working on
+    - key_points holds the 3-5 most important points (deadlines, key decisions, important facts)
+    - action_items holds any required actions
+    Each list holds short strings and may be empty.
+    """)
+
+# Prompt cache reads are billed at a tenth of the normal input rate, and
+# cache writes at 1.25x
+CACHE_READ_COST_FACTOR = 0.1
+CACHE_WRITE_COST_FACTOR = 1.25
+
+# Message Batches API requests are billed at half price
+BATCH_COST_FACTOR = 0.5
+
+# Most insights per topic sent for a per-topic summary
+TOPIC_SUMMARY_MAX_MEMORIES = 20
+
+# (input, output) price in USD per token for each model
+MODEL_PRICING = {
+    "claude-3-sonnet-20240229": (3.00e-6, 15.00e-6),
+    "claude-3-haiku-20240307": (0.25e-6, 1.25e-6),
+}
+
+# Cached responses are reused for screen text whose shingle fingerprint is at
+# least this similar to the cached request's (OCR jitter, a clock ticking)
+SEMANTIC_CACHE_SIMILARITY = 0.9
+
+# Model used for each kind of request. Short summarization jobs go to
+# Haiku; "escalation" is retried when a Haiku reply looks weak
+DEFAULT_MODELS = {
+    "insight": "claude-3-haiku-20240307",
+    "context_insight": "claude-3-haiku-20240307",
+    "answer": "claude-3-haiku-20240307",
+    "key_points": "claude-3-haiku-20240307",
+    "summary": "claude-3-sonnet-20240229",
+    "escalation": "claude-3-sonnet-20240229",
+}
+
+# Replies shorter than this, or opening with a refusal, are retried on the
+# escalation model
+MIN_CONFIDENT_REPLY_CHARS = 20
+REFUSAL_MARKERS = ("i can't", "i cannot", "i'm unable", "i am unable", "i'm not able", "sorry")
+
+# Screen text worth an API call has enough words, neither repeats itself
+# (build output, progress bars) nor never does (hashes, ids), and reads
+# as prose with a few full sentences
+HIGH_VALUE_MIN_WORDS = 20
+HIGH_VALUE_UNIQUE_RATIO = (0.15, 0.9)
+HIGH_VALUE_MIN_SENTENCES = 2
+
+# Rough characters per token, for estimates made without the API. Each
+# reply's reported usage nudges the estimate by CHARS_PER_TOKEN_ADJUST
+CHARS_PER_TOKEN = 4
+CHARS_PER_TOKEN_ADJUST = 0.2
+
+# Screen text token budgets for the prompts that trim their input
+KEY_POINTS_MAX_TEXT_TOKENS = 500
+CONTEXT_INSIGHT_MAX_TEXT_TOKENS = 250
+
+# Connection pool settings for the Anthropic HTTP clients
+HTTP_MAX_CONNECTIONS = 32
+HTTP_TIMEOUT = 30.0  # seconds
+HTTP_CONNECT_TIMEOUT = 3.0  # seconds
+
+# Anthropic clients shared by every ClaudeIntegration, one per API key
+_shared_clients = {}
+_shared_clients_lock = threading.Lock()
+
+def _http_client_options():
+    """Keyword arguments for the SDK's httpx client wrappers"""
+    import httpx
+    options = {
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_CONNECTIONS
+        ),
+        "timeout": httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+    }
+    # HTTP/2 lets concurrent requests share one connection, but httpx only
+    # supports it with the optional h2 package installed
+    if importlib.util.find_spec("h2") is not None:
+        options["http2"] = True
+    return options
+
+def get_client(api_key):
+    """Shared Anthropic client for an API key
+    
+    Reusing one client keeps its connections (and TLS sessions) warm across
+    calls and ClaudeIntegration instances. Raises ImportError if the
+    anthropic package isn't installed.
+    """
+    with _shared_clients_lock:
+        client = _shared_clients.get(api_key)
+        if client is None:
+            from anthropic import Anthropic, DefaultHttpxClient
+            http_client = DefaultHttpxClient(**_http_client_options())
+            client = Anthropic(api_key=api_key, http_client=http_client)
+            atexit.register(http_client.close)
+            _shared_clients[api_key] = client
+        return client
+
 class ClaudeIntegration:
-    def __init__(self, daily_budget: int = 20):
+    def __init__(self, daily_budget: int = 20, models: Optional[Dict[str, str]] = None):
         """Initialize Claude integration with API budget tracking"""
         self.api_key = os.getenv("ANTHROPIC_API_KEY")
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
         
-        self.client = Anthropic(api_key=self.api_key)
-        self.context = []  # Store recent interactions for context
+        self.context = deque(maxlen=5)  # Last 5 interactions, for context
+        
+        # Model per request kind (see DEFAULT_MODELS), optionally overridden
+        self.models = dict(DEFAULT_MODELS, **(models or {}))
         
         # API budget tracking
         self.daily_budget = daily_budget
         self.api_calls_today = 0
-        self.last_budget_reset = time.time()
+        self.last_budget_reset = time.time()  # wall clock, for display only
+        # When the daily counters next reset, on the monotonic clock so
+        # NTP or DST adjustments can't skip or repeat a reset
+        self._next_budget_reset = time.monotonic() + 86400  # 24 hours
         
         # Configure logging
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
         
+        # Anthropic clients, created on first use (see the client and
+        # aclient properties)
+        self._client = None
+        self._aclient = None
+        self._client_available = True
+        
         # Cost tracking
         self.daily_cost = 0.0
         self.total_cost = 0.0
-        self.cost_per_call = 0.00001  # $0.00001 per token (approximate)
+        self.cost_per_call = 0.00001  # $0.00001 per token, for models missing from MODEL_PRICING
         self.max_daily_cost = 1.0  # $1.00 maximum daily cost
+        
+        # Prompt token counts from the API, keyed by a digest of the request
+        self._token_counts = OrderedDict()
+        self._token_counts_max = 256
+        
+        # Characters per token, calibrated from API usage (see _charge)
+        self._chars_per_token = float(CHARS_PER_TOKEN)
+        
+        # LRU of recent API responses keyed by (kind, text digest), so text
+        # seen again shortly (e.g. switching back to a document) is free.
+        # Entries also keep a fingerprint of the text, so near-identical
+        # text can reuse them too
+        self._cache = OrderedDict()
+        self._cache_ttl = 600  # seconds
+        self._cache_max = 128
+        
+        # Split-up copies of the last few texts the local fallbacks saw
+        self._preprocessed = OrderedDict()
+        self._preprocessed_max = 4
+    
+    def _cache_key(self, kind: str, text: str):
+        """Build a response cache key for a request kind and its input text"""
+        return kind, hashlib.sha1(text.encode("utf-8", "surrogatepass")).digest()
+    
+    @staticmethod
+    def _cache_fingerprint(text: str):
+        """Shingle fingerprint of request text, as ScreenDiff computes it"""
+        return text_fingerprint(normalize_for_fingerprint(text[-SIMILARITY_WINDOW:]))
+    
+    def _cache_get(self, key, text: Optional[str] = None) -> Optional[str]:
+        """Get a cached response if present and not older than the TTL
+        
+        If text is given and there is no exact match, fall back to the
+        freshest similar text cached for the same kind of request.
+        """
+        entry = self._cache.get(key)
+        if entry is None and text is not None:
+            key, entry = self._cache_find_similar(key[0], text)
+        if entry is None:
+            return None
+        stored_at, value, _ = entry
+        if time.monotonic() - stored_at >= self._cache_ttl:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return value
+    
+    def _cache_find_similar(self, kind, text: str):
+        """Find the most similar live cache entry of a kind, as (key, entry)"""
+        fingerprint = self._cache_fingerprint(text)
+        oldest = time.monotonic() - self._cache_ttl
+        best_key, best_entry = None, None
+        best_similarity = SEMANTIC_CACHE_SIMILARITY
+        for key, entry in self._cache.items():
+            if key[0] != kind or entry[0] <= oldest:
+                continue
+            similarity = fingerprint_similarity(fingerprint, entry[2])
+            if similarity >= best_similarity:
+                best_key, best_entry, best_similarity = key, entry, similarity
+        return best_key, best_entry
+    
+    def _cache_put(self, key, value: str, text: str):
+        """Store a response, evicting the least recently used past the size limit"""
+        self._cache[key] = (time.monotonic(), value, self._cache_fingerprint(text))
+        self._cache.move_to_end(key)
+        if len(self._cache) > self._cache_max:
+            self._cache.popitem(last=False)
+    
+    @property
+    def client(self):
+        """Anthropic client, or None if the anthropic package isn't installed
+        
+        The SDK is slow to import, so it's loaded on the first API call
+        (on the analysis thread) rather than at startup.
+        """
+        if self._client is None and self._client_available:
+            try:
+                self._client = get_client(self.api_key)
+            except ImportError as e:
+                self.logger.warning(f"anthropic package unavailable, using local processing: {e}")
+                self._client_available = False
+        return self._client
+    
+    @property
+    def aclient(self):
+        """AsyncAnthropic client for the aget_* methods, or None like client
+        
+        Not shared between instances like client: async connections belong
+        to the event loop that opened them.
+        """
+        if self._aclient is None and self._client_available:
+            try:
+                from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+                self._aclient = AsyncAnthropic(
+                    api_key=self.api_key,
+                    http_client=DefaultAsyncHttpxClient(**_http_client_options())
+                )
+            except ImportError as e:
+                self.logger.warning(f"anthropic package unavailable, using local processing: {e}")
+                self._client_available = False
+        return self._aclient
+    
+    @staticmethod
+    def _system_blocks(text: str) -> List[Dict[str, Any]]:
+        """Wrap a system prompt as a content block marked for prompt caching"""
+        return [{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}]
+    
+    def _model_rates(self, model: str):
+        """(input, output) USD per token for a model"""
+        return MODEL_PRICING.get(model, (self.cost_per_call, self.cost_per_call))
+    
+    def _call_cost(self, response, model: str, default_tokens: int) -> float:
+        """Cost of a response from its reported token usage
+        
+        Prompt cache reads and writes are weighted by their discount or
+        premium. Falls back to default_tokens at the output rate if the
+        response carries no usage data.
+        """
+        input_rate, output_rate = self._model_rates(model)
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return default_tokens * output_rate
+        cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+        cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+        input_tokens = (usage.input_tokens
+                        + cache_read * CACHE_READ_COST_FACTOR
+                        + cache_write * CACHE_WRITE_COST_FACTOR)
+        return input_tokens * input_rate + usage.output_tokens * output_rate
+    
+    @staticmethod
+    def _prompt_chars(system, messages) -> int:
+        """Length of a prompt's system blocks and messages"""
+        chars = sum(len(block["text"]) for block in system)
+        return chars + sum(len(message["content"]) for message in messages)
+    
+    def _estimate_tokens(self, system, messages) -> int:
+        """Estimate prompt tokens from its length, without calling the API"""
+        return int(self._prompt_chars(system, messages) / self._chars_per_token) + 1
+    
+    def _charge(self, response, request) -> bool:
+        """Charge a reply to the budget and calibrate the token estimate
+        
+        Returns:
+            False once the daily cost limit is reached
+        """
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            prompt_tokens = (usage.input_tokens
+                             + (getattr(usage, "cache_read_input_tokens", None) or 0)
+                             + (getattr(usage, "cache_creation_input_tokens", None) or 0))
+            if prompt_tokens:
+                observed = self._prompt_chars(request["system"], request["messages"]) / prompt_tokens
+                self._chars_per_token += CHARS_PER_TOKEN_ADJUST * (observed - self._chars_per_token)
+        return self._increment_api_counter(self._call_cost(response, request["model"], request["max_tokens"]))
+    
+    def _fit_to_tokens(self, text: str, max_tokens: int) -> str:
+        """Trim text to about max_tokens tokens
+        
+        Uses the calibrated characters-per-token estimate, and ends on a
+        sentence or line break if one falls in the last fifth of the cut.
+        """
+        limit = int(max_tokens * self._chars_per_token)
+        if len(text) <= limit:
+            return text
+        cut = text[:limit]
+        boundary = max(cut.rfind('.'), cut.rfind('\n'))
+        if boundary >= limit * 0.8:
+            cut = cut[:boundary + 1]
+        return cut
+    
+    def _count_tokens(self, model: str, system, messages) -> int:
+        """Count prompt tokens with the API, falling back to an estimate
+        
+        Results are memoized, so re-checking the same prompt is free.
+        """
+        key = hashlib.sha1(repr((model, system, messages)).encode("utf-8", "surrogatepass")).digest()
+        count = self._token_counts.get(key)
+        if count is not None:
+            self._token_counts.move_to_end(key)
+            return count
+        
+        try:
+            count = self.client.messages.count_tokens(
+                model=model,
+                system=system,
+                messages=messages
+            ).input_tokens
+        except Exception as e:
+            self.logger.warning(f"Token count failed, estimating instead: {e}")
+            return self._estimate_tokens(system, messages)
+        
+        self._token_counts[key] = count
+        if len(self._token_counts) > self._token_counts_max:
+            self._token_counts.popitem(last=False)
+        return count
+    
+    def _fits_cost_budget(self, model: str, system, messages, max_tokens: int) -> bool:
+        """Check that a request can't push the daily cost past its limit
+        
+        Assumes the full max_tokens is generated. Prompts that are clearly
+        affordable by a length estimate skip the count_tokens round trip.
+        """
+        remaining = self.max_daily_cost - self.daily_cost
+        input_rate, output_rate = self._model_rates(model)
+        
+        def worst_case(prompt_tokens):
+            return prompt_tokens * input_rate + max_tokens * output_rate
+        
+        if worst_case(self._estimate_tokens(system, messages)) * 2 <= remaining:
+            return True
+        if worst_case(self._count_tokens(model, system, messages)) <= remaining:
+            return True
+        self.logger.warning(f"Request would exceed the daily cost limit of ${self.max_daily_cost}. Using local processing.")
+        return False
+    
+    def _fits_request_budget(self, request) -> bool:
+        """_fits_cost_budget for a dict of messages.create arguments"""
+        return self._fits_cost_budget(
+            request["model"], request["system"], request["messages"], request["max_tokens"]
+        )
+    
+    @staticmethod
+    def _looks_weak(response) -> bool:
+        """Check whether a reply is too short or a refusal to trust"""
+        text = response.content[0].text.strip()
+        return len(text) < MIN_CONFIDENT_REPLY_CHARS or text.lower().startswith(REFUSAL_MARKERS)
+    
+    def _escalation_request(self, request, response):
+        """Request to retry on the escalation model, or None to keep response
+        
+        The first call is charged here, as the caller only charges the
+        final one.
+        """
+        escalation = self.models["escalation"]
+        if request["model"] == escalation or not self._looks_weak(response):
+            return None
+        self._charge(response, request)
+        request = dict(request, model=escalation)
+        if not self._fits_request_budget(request):
+            return None
+        self.logger.info(f"Weak reply, retrying with {escalation}")
+        return request
+    
+    def _create_message(self, request):
+        """messages.create, escalating weak replies to a stronger model
+        
+        Returns:
+            (response, request) for the call that produced the response
+        """
+        response = self.client.messages.create(**request)
+        retry = self._escalation_request(request, response)
+        if retry is None:
+            return response, request
+        return self.client.messages.create(**retry), retry
+    
+    async def _acreate_message(self, request):
+        """Async _create_message"""
+        response = await self.aclient.messages.create(**request)
+        retry = self._escalation_request(request, response)
+        if retry is None:
+            return response, request
+        return await self.aclient.messages.create(**retry), retry
+    
+    def _stream_request(self, request, chunks):
+        """Yield reply text from messages.stream, also appending it to chunks
+        
+        Usage is charged when the stream ends, or estimated if the reader
+        closes it early. Closing the generator stops the API stream.
+        """
+        final = None
+        try:
+            with self.client.messages.stream(**request) as stream:
+                for text in stream.text_stream:
+                    chunks.append(text)
+                    yield text
+                final = stream.get_final_message()
+        finally:
+            # A reply with no text is still billed
+            if final is not None or chunks:
+                self._charge(final, request)
     
     def _check_api_budget(self) -> bool:
         """Check if API budget is exceeded and reset if needed"""
-        current_time = time.time()
+        if self.client is None:
+            return False
         
         # Reset counter if it's a new day
-        if current_time - self.last_budget_reset > 86400:  # 24 hours
+        now = time.monotonic()
+        if now >= self._next_budget_reset:
             self.api_calls_today = 0
             self.daily_cost = 0.0
-            self.last_budget_reset = current_time
+            self.last_budget_reset = time.time()
+            self._next_budget_reset = now + 86400  # 24 hours
         
         return self.api_calls_today < self.daily_budget
     
-    def _increment_api_counter(self, tokens_used: int = 1000):
+    def _increment_api_counter(self, call_cost: float):
         """Increment the API call counter and cost tracking"""
         self.api_calls_today += 1
-        call_cost = tokens_used * self.cost_per_call
         self.daily_cost += call_cost
         self.total_cost += call_cost
         
@@ -65,44 +545,107 @@ class ClaudeIntegration:
         if not screen_text or len(screen_text.strip()) < 10:
             return "Not enough text on screen to analyze."
         
-        prompt = f"""
-        I'm looking at my screen which contains the following text:
+        cache_key = self._cache_key("insights", screen_text)
+        cached = self._cache_get(cache_key, screen_text)
+        if cached is not None:
+            return cached
         
-        {screen_text}
+        request = self._insights_request(screen_text)
+        try:
+            if not self._fits_request_budget(request):
+                return "API cost limit reached. Please try again later."
+            
+            response, request = self._create_message(request)
+            return self._record_insight(screen_text, cache_key, request, response)
         
-        Based on this information, what are 1-3 key insights or helpful observations you can provide? 
-        Focus on what might be most helpful to know right now given what I'm working on.
-        Keep your response brief and focused.
+        except Exception as e:
+            return f"Error getting insights: {str(e)}"
+    
+    async def aget_insights(self, screen_text):
+        """Async get_insights, so callers can overlap it with other requests
+        
+        e.g. asyncio.gather(claude.aget_insights(text), claude.aget_key_points(text))
         """
+        if not screen_text or len(screen_text.strip()) < 10:
+            return "Not enough text on screen to analyze."
+        
+        cache_key = self._cache_key("insights", screen_text)
+        cached = self._cache_get(cache_key, screen_text)
+        if cached is not None:
+            return cached
         
+        request = self._insights_request(screen_text)
         try:
-            response = self.client.messages.create(
-                model="claude-3-sonnet-20240229",
-                max_tokens=300,  # Keep responses brief
-                system="You are ScreenMate, an AI assistant that helps users understand what they're working on. Provide brief, focused insights that would be most helpful given what's visible on screen. Don't explain what ScreenMate is - just provide the insights directly.",
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            
-            insight = response.content[0].text
-            
-            # Add to context for future reference
-            if len(self.context) >= 5:  # Keep only last 5 interactions
-                self.context.pop(0)
-            self.context.append({
-                "screen_text": screen_text,
-                "insight": insight
-            })
-            
-            # Track API usage and cost
-            self._increment_api_counter(300)  # Approximate token count
+            if not self._fits_request_budget(request):
+                return "API cost limit reached. Please try again later."
             
-            return insight
+            response, request = await self._acreate_message(request)
+            return self._record_insight(screen_text, cache_key, request, response)
         
         except Exception as e:
             return f"Error getting insights: {str(e)}"
     
+    def _insights_request(self, screen_text):
+        """Build the messages.create arguments for get_insights"""
+        prompt = INSIGHTS_PROMPT.format(screen_text=screen_text)
+        return {
+            "model": self.models["insight"],
+            "max_tokens": 300,  # Keep responses brief
+            "system": self._system_blocks(INSIGHTS_SYSTEM),
+            "messages": [{"role": "user", "content": prompt}]
+        }
+    
+    def _record_insight(self, screen_text, cache_key, request, response):
+        """Track, remember and cache an insight response, returning its text"""
+        insight = response.content[0].text
+        
+        # Track API usage and cost
+        self._charge(response, request)
+        
+        self._remember_insight(screen_text, cache_key, insight)
+        return insight
+    
+    def _remember_insight(self, screen_text, cache_key, insight):
+        """Add an insight to the context and the response cache"""
+        # Add to context for future reference
+        self.context.append({
+            "screen_text": screen_text,
+            "insight": insight
+        })
+        
+        self._cache_put(cache_key, insight, screen_text)
+    
+    def iter_insights(self, screen_text):
+        """Stream get_insights' reply as Claude generates it
+        
+        Yields text chunks that join to the full result; cached results and
+        errors arrive as a single chunk. Unlike get_insights, weak replies
+        are not retried on a stronger model, as they have already been shown.
+        """
+        if not screen_text or len(screen_text.strip()) < 10:
+            yield "Not enough text on screen to analyze."
+            return
+        
+        cache_key = self._cache_key("insights", screen_text)
+        cached = self._cache_get(cache_key, screen_text)
+        if cached is not None:
+            yield cached
+            return
+        
+        request = self._insights_request(screen_text)
+        chunks = []
+        try:
+            if not self._fits_request_budget(request):
+                yield "API cost limit reached. Please try again later."
+                return
+            yield from self._stream_request(request, chunks)
+        except Exception as e:
+            self.logger.error(f"Error getting insights: {e}")
+            if not chunks:
+                yield f"Error getting insights: {str(e)}"
+        else:
+            self._remember_insight(screen_text, cache_key, "".join(chunks))
+    
     def get_insights_with_context(self, screen_text: str, input_context: Dict[str, Any], use_api: bool = True) -> str:
         """Get insights from Claude with context, respecting API budget"""
         if not screen_text or len(screen_text) < 50:
@@ -112,33 +655,34 @@ class ClaudeIntegration:
         if not use_api or not self._check_api_budget():
             self.logger.info("API budget exceeded or economy mode enabled, using local processing")
             return self._generate_local_insight(screen_text, input_context)
+        
+        if not self._is_high_value(screen_text):
+            self.logger.debug("Screen text looks like noise, using local processing")
+            return self._generate_local_insight(screen_text, input_context)
             
         try:
             # Prepare the prompt with context
-            prompt = f"""
-            Analyze this screen content and user context to provide insights:
-            
-            Screen Content:
-            {screen_text[:1000]}  # Limit content length
-            
-            User Context:
-            Current App: {input_context.get('current_app', {}).get('name', 'Unknown')}
-            Recent Activity: {input_context.get('recent_activity', [])}
+            prompt = CONTEXT_INSIGHT_PROMPT.format(
+                screen_text=self._fit_to_tokens(screen_text, CONTEXT_INSIGHT_MAX_TEXT_TOKENS),
+                app_name=input_context.get('current_app', {}).get('name', 'Unknown'),
+                recent_activity=input_context.get('recent_activity', [])
+            )
             
-            Provide a brief, actionable insight about what the user is doing and any relevant suggestions.
-            Focus on productivity and workflow improvements.
-            """
+            request = {
+                "model": self.models["context_insight"],
+                "max_tokens": 150,
+                "temperature": 0.7,
+                "system": self._system_blocks(SCREENMATE_SYSTEM),
+                "messages": [{"role": "user", "content": prompt}]
+            }
+            if not self._fits_request_budget(request):
+                return self._generate_local_insight(screen_text, input_context)
             
             # Get response from Claude
-            response = self.client.messages.create(
-                model="claude-3-sonnet-20240229",
-                max_tokens=150,
-                temperature=0.7,
-                messages=[{"role": "user", "content": prompt}]
-            )
+            response, request = self._create_message(request)
             
             # Track API usage and cost
-            if not self._increment_api_counter(150):  # Approximate token count
+            if not self._charge(response, request):
                 return self._generate_local_insight(screen_text, input_context)
                 
             return response.content[0].text
@@ -151,15 +695,12 @@ class ClaudeIntegration:
         """Generate a simple insight without using the API"""
         app_name = input_context.get('current_app', {}).get('name', 'Unknown')
         
-        # Extract key phrases (simple implementation)
-        words = screen_text.lower().split()
-        word_freq = {}
-        for word in words:
-            if len(word) > 3:  # Skip short words
-                word_freq[word] = word_freq.get(word, 0) + 1
+        # Extract key phrases (simple implementation), skipping short words
+        _, _, words = self._preprocess(screen_text)
+        word_freq = Counter(word for word in words if len(word) > 3)
                 
-        # Get most common words
-        common_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:5]
+        # Get most common words (ties keep first-seen order, as sorted() did)
+        common_words = word_freq.most_common(5)
         
         # Generate simple insight
         insight = f"Working in {app_name}. "
@@ -175,35 +716,61 @@ class ClaudeIntegration:
         
     def get_answer(self, question, screen_text):
         """Get a specific answer to a question about the screen content"""
-        prompt = f"""
-        Based on the following screen content:
-        
-        {screen_text}
-        
-        Please answer this question: {question}
-        
-        Keep your response brief and focused on the question.
-        """
+        cache_key = self._cache_key(f"answer:{question}", screen_text)
+        cached = self._cache_get(cache_key, screen_text)
+        if cached is not None:
+            return cached
         
+        request = self._answer_request(question, screen_text)
         try:
-            response = self.client.messages.create(
-                model="claude-3-sonnet-20240229",
-                max_tokens=300,
-                system="You are ScreenMate, an AI assistant that helps users understand what they're working on. Provide clear, concise answers to questions about the screen content.",
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
+            if not self._fits_request_budget(request):
+                return "API cost limit reached. Please try again later."
+            
+            response, request = self._create_message(request)
             
             # Track API usage and cost
-            if not self._increment_api_counter(300):  # Approximate token count
+            if not self._charge(response, request):
                 return "API cost limit reached. Please try again later."
-                
-            return response.content[0].text
+            
+            answer = response.content[0].text
+            self._cache_put(cache_key, answer, screen_text)
+            return answer
         
         except Exception as e:
             return f"Error getting answer: {str(e)}"
     
+    def iter_answer(self, question, screen_text):
+        """Stream get_answer's reply as Claude generates it (see iter_insights)"""
+        cache_key = self._cache_key(f"answer:{question}", screen_text)
+        cached = self._cache_get(cache_key, screen_text)
+        if cached is not None:
+            yield cached
+            return
+        
+        request = self._answer_request(question, screen_text)
+        chunks = []
+        try:
+            if not self._fits_request_budget(request):
+                yield "API cost limit reached. Please try again later."
+                return
+            yield from self._stream_request(request, chunks)
+        except Exception as e:
+            self.logger.error(f"Error getting answer: {e}")
+            if not chunks:
+                yield f"Error getting answer: {str(e)}"
+        else:
+            self._cache_put(cache_key, "".join(chunks), screen_text)
+    
+    def _answer_request(self, question, screen_text):
+        """Build the messages.create arguments for get_answer"""
+        prompt = ANSWER_PROMPT.format(screen_text=screen_text, question=question)
+        return {
+            "model": self.models["answer"],
+            "max_tokens": 300,
+            "system": self._system_blocks(ANSWER_SYSTEM),
+            "messages": [{"role": "user", "content": prompt}]
+        }
+    
     def generate_daily_summary(self, memories: List[Dict[str, Any]], use_api: bool = True) -> str:
         """Generate a summary of daily insights with budget awareness"""
         if not memories:
@@ -214,47 +781,14 @@ class ClaudeIntegration:
             return self._generate_local_summary(memories)
             
         try:
-            # Group memories by topic
-            topics_to_memories = {}
-            for memory in memories:
-                for topic in memory.get('topics', []):
-                    if topic not in topics_to_memories:
-                        topics_to_memories[topic] = []
-                    topics_to_memories[topic].append(memory)
-                    
-            # Create compact representation
-            summary_points = []
-            for topic, topic_memories in topics_to_memories.items():
-                topic_summary = f"Topic: {topic} ({len(topic_memories)} insights)"
-                key_points = [m['content'].split('.')[0] + '.' for m in topic_memories[:3]]
-                topic_summary += "\n - " + "\n - ".join(key_points)
-                summary_points.append(topic_summary)
-                
-            all_memory_text = "\n\n".join(summary_points)
-            
-            # Generate summary with Claude
-            prompt = f"""
-            Please create a concise summary of today's insights, already grouped by topic:
-            
-            {all_memory_text}
-            
-            Create a well-organized summary that:
-            1. Highlights the most important information from each topic
-            2. Presents any action items or key takeaways
-            3. Is brief but comprehensive
-            
-            Format the summary with clear headings and bullet points.
-            """
+            request = self._daily_summary_request(memories)
+            if not self._fits_request_budget(request):
+                return self._generate_local_summary(memories)
             
-            response = self.client.messages.create(
-                model="claude-3-sonnet-20240229",
-                max_tokens=500,
-                temperature=0.7,
-                messages=[{"role": "user", "content": prompt}]
-            )
+            response = self.client.messages.create(**request)
             
             # Track API usage and cost
-            if not self._increment_api_counter(500):  # Approximate token count
+            if not self._charge(response, request):
                 return self._generate_local_summary(memories)
                 
             return response.content[0].text
@@ -262,35 +796,196 @@ class ClaudeIntegration:
         except Exception as e:
             self.logger.error(f"Error generating summary: {e}")
             return self._generate_local_summary(memories)
+    
+    def iter_daily_summary(self, memories: List[Dict[str, Any]], use_api: bool = True):
+        """Stream generate_daily_summary's result as Claude generates it
+        
+        Yields text chunks that join to the full summary; local summaries
+        arrive as a single chunk.
+        """
+        if not memories:
+            yield "No insights collected today."
+            return
+        
+        if not use_api or not self._check_api_budget():
+            yield self._generate_local_summary(memories)
+            return
+        
+        chunks = []
+        try:
+            request = self._daily_summary_request(memories)
+            if not self._fits_request_budget(request):
+                yield self._generate_local_summary(memories)
+                return
+            yield from self._stream_request(request, chunks)
+        except Exception as e:
+            self.logger.error(f"Error generating summary: {e}")
+            if not chunks:
+                yield self._generate_local_summary(memories)
+    
+    def _daily_summary_request(self, memories: List[Dict[str, Any]]):
+        """Build the messages.create arguments for the daily summary"""
+        # Group memories by topic
+        topics_to_memories = self._group_by_topic(memories)
+                
+        # Create compact representation
+        summary_points = [
+            self._topic_digest(topic, topic_memories, 3)
+            for topic, topic_memories in topics_to_memories.items()
+        ]
+            
+        all_memory_text = "\n\n".join(summary_points)
+        
+        # The instructions are a cached system block; only the memories
+        # change from day to day
+        return {
+            "model": self.models["summary"],
+            "max_tokens": 500,
+            "temperature": 0.7,
+            "system": self._system_blocks(DAILY_SUMMARY_SYSTEM),
+            "messages": [{"role": "user", "content": all_memory_text}]
+        }
+            
+    def generate_topic_summaries(self, memories: List[Dict[str, Any]], use_api: bool = True,
+                                 poll_interval: float = 30.0, timeout: float = 3600.0) -> Dict[str, str]:
+        """Summarize each topic separately through the Message Batches API
+        
+        Batched requests cost half as much but may take minutes to
+        process, so this blocks (polling every poll_interval seconds) and
+        suits background jobs rather than the UI. Topics that can't be
+        summarized by the API get a local summary.
+        
+        Returns:
+            Dict mapping each topic to its summary
+        """
+        topics_to_memories = self._group_by_topic(memories)
+        summaries = {}
+        if not topics_to_memories:
+            return summaries
+        
+        # custom_id must be short and alphanumeric, so topics get an index
+        requests = {}
+        if use_api and self._check_api_budget():
+            model = self.models["summary"]
+            max_tokens = 300
+            system = self._system_blocks(TOPIC_SUMMARY_SYSTEM)
+            input_rate, output_rate = self._model_rates(model)
+            # The batch is only charged once results arrive, so its worst
+            # case is totalled up front against what's left for the day
+            remaining_cost = self.max_daily_cost - self.daily_cost
+            remaining_calls = self.daily_budget - self.api_calls_today
+            batch_cost = 0.0
+            
+            def worst_case(prompt_tokens):
+                return (prompt_tokens * input_rate + max_tokens * output_rate) * BATCH_COST_FACTOR
             
+            for i, (topic, topic_memories) in enumerate(topics_to_memories.items()):
+                if len(requests) >= remaining_calls:
+                    break
+                params = {
+                    "model": model,
+                    "max_tokens": max_tokens,
+                    "system": system,
+                    "messages": [{
+                        "role": "user",
+                        "content": self._topic_digest(topic, topic_memories, TOPIC_SUMMARY_MAX_MEMORIES)
+                    }]
+                }
+                # Doubling the length estimate leaves room for its error, so
+                # count_tokens is only asked near the end of the budget
+                request_cost = worst_case(self._estimate_tokens(system, params["messages"])) * 2
+                if batch_cost + request_cost > remaining_cost:
+                    request_cost = worst_case(self._count_tokens(model, system, params["messages"]))
+                if batch_cost + request_cost > remaining_cost:
+                    self.logger.warning(f"Summary batch would exceed the daily cost limit of ${self.max_daily_cost}. Summarizing the rest locally.")
+                    break
+                batch_cost += request_cost
+                requests[f"topic-{i}"] = (topic, params)
+        
+        if requests:
+            try:
+                batch = self.client.messages.batches.create(requests=[
+                    {"custom_id": custom_id, "params": params}
+                    for custom_id, (_, params) in requests.items()
+                ])
+                deadline = time.monotonic() + timeout
+                while batch.processing_status != "ended":
+                    if time.monotonic() >= deadline:
+                        self.logger.warning(f"Summary batch {batch.id} timed out, cancelling")
+                        self.client.messages.batches.cancel(batch.id)
+                        break
+                    time.sleep(poll_interval)
+                    batch = self.client.messages.batches.retrieve(batch.id)
+                else:
+                    for entry in self.client.messages.batches.results(batch.id):
+                        if entry.custom_id not in requests or entry.result.type != "succeeded":
+                            continue
+                        topic, params = requests[entry.custom_id]
+                        message = entry.result.message
+                        summaries[topic] = message.content[0].text
+                        self._increment_api_counter(
+                            self._call_cost(message, params["model"], params["max_tokens"]) * BATCH_COST_FACTOR
+                        )
+            except Exception as e:
+                self.logger.error(f"Error generating topic summaries: {e}")
+        
+        # Anything the batch didn't cover is summarized locally
+        for topic, topic_memories in topics_to_memories.items():
+            if topic not in summaries:
+                summaries[topic] = self._generate_local_summary(
+                    [dict(memory, topics=[topic]) for memory in topic_memories]
+                )
+        return summaries
+    
+    @staticmethod
+    def _topic_digest(topic: str, topic_memories: List[Dict[str, Any]], limit: int) -> str:
+        """Compact text for a topic: its insight count and first few first sentences"""
+        key_points = [m['content'].split('.', 1)[0] + '.' for m in topic_memories[:limit]]
+        return f"Topic: {topic} ({len(topic_memories)} insights)" + "\n - " + "\n - ".join(key_points)
+    
+    @staticmethod
+    def _group_by_topic(memories: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Group memories by topic, in first-seen topic order"""
+        topics_to_memories = defaultdict(list)
+        for memory in memories:
+            for topic in memory.get('topics', ()):
+                topics_to_memories[topic].append(memory)
+        return topics_to_memories
+    
     def _generate_local_summary(self, memories: List[Dict[str, Any]]) -> str:
         """Generate a simple summary without API calls"""
         # Group by topic
-        topics_to_memories = {}
-        for memory in memories:
-            for topic in memory.get('topics', []):
-                if topic not in topics_to_memories:
-                    topics_to_memories[topic] = []
-                topics_to_memories[topic].append(memory)
+        topics_to_memories = self._group_by_topic(memories)
                 
         # Generate summary text
-        summary = "# Today's Insights Summary\n\n"
+        lines = ["# Today's Insights Summary", ""]
         
         # Add date
-        summary += f"Date: {time.strftime('%Y-%m-%d', time.localtime())}\n\n"
+        lines += [f"Date: {time.strftime('%Y-%m-%d', time.localtime())}", ""]
+        
+        # UTC offsets per quarter hour, so DST changes still land correctly
+        # without a localtime/strftime round trip for every memory
+        utc_offsets = {}
         
         # Add topics sections
         for topic, topic_memories in topics_to_memories.items():
-            summary += f"## {topic.title()} ({len(topic_memories)} insights)\n\n"
+            lines += [f"## {topic.title()} ({len(topic_memories)} insights)", ""]
             
             # Add key points
             for memory in topic_memories[:5]:  # Limit to 5 per topic
-                timestamp = time.strftime("%H:%M", time.localtime(memory['timestamp']))
-                summary += f"- [{timestamp}] {memory['content'].split('.')[0]}.\n"
+                seconds = int(memory['timestamp'])
+                quarter = seconds // 900
+                offset = utc_offsets.get(quarter)
+                if offset is None:
+                    offset = utc_offsets[quarter] = time.localtime(seconds).tm_gmtoff
+                seconds += offset
+                timestamp = f"{seconds // 3600 % 24:02d}:{seconds // 60 % 60:02d}"
+                lines.append(f"- [{timestamp}] {memory['content'].split('.', 1)[0]}.")
             
-            summary += "\n"
+            lines.append("")
             
-        return summary
+        lines.append("")
+        return "\n".join(lines)
         
     def get_api_usage_stats(self) -> Dict[str, Any]:
         """Get API usage statistics"""
@@ -304,71 +999,250 @@ class ClaudeIntegration:
     
     def get_key_points(self, screen_text, use_api=True):
         """Extract key points from screen text with cost control"""
+        return "".join(self.iter_key_points(screen_text, use_api=use_api))
+    
+    def iter_key_points(self, screen_text, use_api=True):
+        """Stream key points from screen text as Claude generates them
+        
+        Yields text chunks that join to the full result. Local and cached
+        results arrive as a single chunk. Closing the generator early stops
+        the API stream.
+        """
+        if not screen_text or len(screen_text.strip()) < 50:
+            yield "Not enough text to extract key points."
+            return
+        
+        # Enforce character limit to control costs
+        screen_text = self._fit_to_tokens(screen_text, KEY_POINTS_MAX_TEXT_TOKENS)
+        
+        # Check budget before making API call
+        if not use_api or not self._check_api_budget() or not self._is_high_value(screen_text):
+            yield self._extract_key_points_local(screen_text)
+            return
+        
+        cache_key = self._cache_key("key_points", screen_text)
+        cached = self._cache_get(cache_key, screen_text)
+        if cached is not None:
+            yield cached
+            return
+        
+        request = self._key_points_request(screen_text)
+        if not self._fits_request_budget(request):
+            yield self._extract_key_points_local(screen_text)
+            return
+        
+        chunks = []
+        try:
+            yield from self._stream_request(request, chunks)
+        except Exception as e:
+            self.logger.error(f"Error getting key points: {e}")
+            # Only fall back if nothing was shown yet; a partial answer stands
+            if not chunks:
+                yield self._extract_key_points_local(screen_text)
+        else:
+            self._cache_put(cache_key, "".join(chunks), screen_text)
+    
+    async def aget_key_points(self, screen_text, use_api=True):
+        """Async get_key_points, returning the whole result at once"""
         if not screen_text or len(screen_text.strip()) < 50:
             return "Not enough text to extract key points."
         
         # Enforce character limit to control costs
-        screen_text = screen_text[:2000] if len(screen_text) > 2000 else screen_text
+        screen_text = self._fit_to_tokens(screen_text, KEY_POINTS_MAX_TEXT_TOKENS)
         
         # Check budget before making API call
-        if not use_api or not self._check_api_budget():
+        if not use_api or not self._check_api_budget() or not self._is_high_value(screen_text):
             return self._extract_key_points_local(screen_text)
         
-        prompt = f"""
-        Extract the 3-5 most important points and any action items from this content:
+        cache_key = self._cache_key("key_points", screen_text)
+        cached = self._cache_get(cache_key, screen_text)
+        if cached is not None:
+            return cached
         
-        {screen_text}
-        
-        Format your response as a bulleted list. For action items, add "(ACTION ITEM)" at the end.
-        Focus on deadlines, key decisions, important facts, and required actions.
-        Be concise and clear.
-        """
+        request = self._key_points_request(screen_text)
+        if not self._fits_request_budget(request):
+            return self._extract_key_points_local(screen_text)
         
         try:
-            response = self.client.messages.create(
-                model="claude-3-haiku-20240307",  # Use cheaper model for MVP
-                max_tokens=200,  # Limit token usage
-                system="You extract key points from text. Be concise and highlight only the most important information.",
-                messages=[{"role": "user", "content": prompt}]
-            )
-            
-            # Track API usage and cost
-            self._increment_api_counter(200)  # Approximate token count
-            
-            return response.content[0].text
+            response = await self.aclient.messages.create(**request)
         except Exception as e:
             self.logger.error(f"Error getting key points: {e}")
             return self._extract_key_points_local(screen_text)
+        
+        key_points = response.content[0].text
+        self._charge(response, request)
+        self._cache_put(cache_key, key_points, screen_text)
+        return key_points
     
-    def _extract_key_points_local(self, text):
-        """Extract key points without API calls"""
-        # Simple rule-based extraction
-        sentences = text.split('.')
-        key_points = []
+    def _key_points_request(self, screen_text):
+        """Build the messages.create/stream arguments for key points"""
+        prompt = KEY_POINTS_PROMPT.format(screen_text=screen_text)
+        return {
+            "model": self.models["key_points"],
+            "max_tokens": 200,  # Limit token usage
+            "system": self._system_blocks(KEY_POINTS_SYSTEM),
+            "messages": [{"role": "user", "content": prompt}]
+        }
+    
+    def _is_high_value(self, text) -> bool:
+        """Whether screen text is worth an API call rather than local processing"""
+        _, _, words = self._preprocess(text)
+        if len(words) < HIGH_VALUE_MIN_WORDS:
+            return False
+        
+        unique_ratio = len(set(words)) / len(words)
+        low, high = HIGH_VALUE_UNIQUE_RATIO
+        if not low <= unique_ratio <= high:
+            return False
         
-        # Keywords that suggest importance
-        important_keywords = ['must', 'important', 'critical', 'deadline', 'required', 
-                            'key', 'essential', 'urgent', 'necessary', 'vital']
+        return text.count('. ') >= HIGH_VALUE_MIN_SENTENCES
+    
+    def _preprocess(self, text):
+        """Lower-cased text, '.'-separated sentences and lower-cased words
+        
+        Shared by the local fallbacks, so a frame that goes through several
+        of them is only split up once. Keyed by the text itself: strings
+        cache their hash, and the same object compares equal at once.
+        """
+        result = self._preprocessed.get(text)
+        if result is not None:
+            self._preprocessed.move_to_end(text)
+            return result
         
-        # Action verbs that suggest tasks
-        action_verbs = ['submit', 'complete', 'send', 'prepare', 'review', 'update', 
-                       'create', 'finish', 'deliver', 'schedule']
+        lowered = text.lower()
+        result = (lowered, text.split('.'), lowered.split())
+        self._preprocessed[text] = result
+        if len(self._preprocessed) > self._preprocessed_max:
+            self._preprocessed.popitem(last=False)
+        return result
+    
+    def get_insights_and_key_points(self, screen_text, use_api=True):
+        """Get insights and key points from one API call
         
-        # Check each sentence for importance
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence:
+        Cheaper than get_insights plus get_key_points when both are wanted,
+        as the screen text is only sent once.
+        
+        Returns:
+            Dict with "insights", "key_points" and "action_items" lists
+        """
+        if not screen_text or len(screen_text.strip()) < 50:
+            return {"insights": [], "key_points": [], "action_items": []}
+        
+        # Enforce character limit to control costs
+        screen_text = self._fit_to_tokens(screen_text, KEY_POINTS_MAX_TEXT_TOKENS)
+        
+        if not use_api or not self._check_api_budget() or not self._is_high_value(screen_text):
+            return self._local_insights_and_key_points(screen_text)
+        
+        cache_key = self._cache_key("insights_and_key_points", screen_text)
+        cached = self._cache_get(cache_key, screen_text)
+        if cached is not None:
+            return cached
+        
+        request = {
+            "model": self.models["insight"],
+            "max_tokens": 500,
+            "system": self._system_blocks(INSIGHTS_AND_KEY_POINTS_SYSTEM),
+            "messages": [
+                {"role": "user", "content": INSIGHTS_AND_KEY_POINTS_PROMPT.format(screen_text=screen_text)},
+                # Prefill the reply so it starts as the JSON object
+                {"role": "assistant", "content": "{"}
+            ]
+        }
+        try:
+            if not self._fits_request_budget(request):
+                return self._local_insights_and_key_points(screen_text)
+            
+            response, request = self._create_message(request)
+            self._charge(response, request)
+            result = self._parse_insights_and_key_points("{" + response.content[0].text)
+        
+        except Exception as e:
+            self.logger.error(f"Error getting insights and key points: {e}")
+            return self._local_insights_and_key_points(screen_text)
+        
+        self.context.append({
+            "screen_text": screen_text,
+            "insight": "\n".join(result["insights"])
+        })
+        self._cache_put(cache_key, result, screen_text)
+        return result
+    
+    @staticmethod
+    def _parse_insights_and_key_points(text):
+        """Parse a get_insights_and_key_points reply into its three lists
+        
+        Raises:
+            ValueError: if the reply holds no JSON object
+        """
+        try:
+            data = json.loads(text)
+        except ValueError:
+            # Tolerate a code fence or chatter around the object
+            start, end = text.find('{'), text.rfind('}')
+            if start < 0 or end < start:
+                raise
+            data = json.loads(text[start:end + 1])
+        if not isinstance(data, dict):
+            raise ValueError("reply is not a JSON object")
+        
+        result = {}
+        for field in ("insights", "key_points", "action_items"):
+            value = data.get(field) or []
+            if not isinstance(value, list):
+                value = [value]
+            result[field] = [str(item).strip() for item in value if str(item).strip()]
+        return result
+    
+    def _local_insights_and_key_points(self, screen_text):
+        """get_insights_and_key_points without API calls"""
+        key_points, action_items = [], []
+        for line in self._extract_key_points_local(screen_text).splitlines():
+            if not line.startswith("• "):
                 continue
-                
-            # Check if sentence contains important keywords
-            if any(keyword in sentence.lower() for keyword in important_keywords):
+            if line.endswith(" (ACTION ITEM)"):
+                action_items.append(line[2:-len(" (ACTION ITEM)")])
+            else:
+                key_points.append(line[2:])
+        return {
+            "insights": [self._generate_local_insight(screen_text, {}).strip()],
+            "key_points": key_points,
+            "action_items": action_items
+        }
+    
+    @staticmethod
+    def _sentences_matching(pattern, text):
+        """Indexes of the '.'-separated sentences of text that pattern matches"""
+        indexes = set()
+        index = 0
+        position = 0
+        match = pattern.search(text)
+        while match:
+            # Count the periods skipped since the last hit (in C)
+            index += text.count('.', position, match.start())
+            indexes.add(index)
+            # One hit is enough; resume at the end of this sentence
+            position = text.find('.', match.end())
+            if position < 0:
+                break
+            match = pattern.search(text, position)
+        return indexes
+    
+    def _extract_key_points_local(self, text):
+        """Extract key points without API calls"""
+        # Simple rule-based extraction. Scan the whole lower-cased text once
+        # per keyword set, so sentences without keywords are never visited
+        lowered, sentences, _ = self._preprocess(text)
+        important = self._sentences_matching(_IMPORTANT_RE, lowered)
+        actions = self._sentences_matching(_ACTION_RE, lowered)
+        
+        key_points = []
+        for i in sorted(important | actions):
+            sentence = sentences[i].strip()
+            if i in important:
                 key_points.append(f"• {sentence}.")
-                continue
-                
-            # Check if sentence contains action verbs
-            if any(verb in sentence.lower() for verb in action_verbs):
+            else:
                 key_points.append(f"• {sentence}. (ACTION ITEM)")
-                continue
         
         # If we couldn't find important sentences, take the first few
         if not key_points and len(sentences) > 3:
@@ -379,4 +1253,4 @@ class ClaudeIntegration:
         if not key_points:
             return "No key points identified."
             
-        return "\n".join(key_points) 
\ No newline at end of file
+        return "\n".join(key_points)
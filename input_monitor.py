@@ -1,34 +1,140 @@
+import re
+import select
 import threading
 import time
 import queue
 import platform
 from pynput import keyboard, mouse
-from collections import deque
+from collections import deque, namedtuple
 import json
 import os
 
+try:
+    import orjson
+except ImportError:  # Fall back to the slower stdlib json
+    orjson = None
+
+# Checked once; window tracking is bound to the platform's methods at init
+SYSTEM = platform.system()
+
 # For window tracking
-if platform.system() == "Windows":
-    import pygetwindow as gw
-elif platform.system() == "Darwin":  # macOS
-    from AppKit import NSWorkspace
+if SYSTEM == "Windows":
+    import ctypes
+    import ctypes.wintypes
+
+    user32 = ctypes.windll.user32
+    kernel32 = ctypes.windll.kernel32
+    user32.GetForegroundWindow.restype = ctypes.wintypes.HWND
+    user32.GetWindowTextLengthW.argtypes = [ctypes.wintypes.HWND]
+    user32.GetWindowTextW.argtypes = [ctypes.wintypes.HWND, ctypes.wintypes.LPWSTR, ctypes.c_int]
+    user32.GetWindowThreadProcessId.argtypes = [ctypes.wintypes.HWND, ctypes.POINTER(ctypes.wintypes.DWORD)]
+    kernel32.OpenProcess.restype = ctypes.wintypes.HANDLE
+    kernel32.QueryFullProcessImageNameW.argtypes = [
+        ctypes.wintypes.HANDLE, ctypes.wintypes.DWORD, ctypes.wintypes.LPWSTR, ctypes.POINTER(ctypes.wintypes.DWORD)
+    ]
+    kernel32.CloseHandle.argtypes = [ctypes.wintypes.HANDLE]
+
+    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    WM_QUIT = 0x0012
+    WinEventProc = ctypes.WINFUNCTYPE(
+        None, ctypes.wintypes.HANDLE, ctypes.wintypes.DWORD, ctypes.wintypes.HWND,
+        ctypes.wintypes.LONG, ctypes.wintypes.LONG, ctypes.wintypes.DWORD, ctypes.wintypes.DWORD
+    )
+elif SYSTEM == "Darwin":  # macOS
+    import objc
+    from AppKit import NSObject, NSWorkspace
     from Quartz import (
         CGWindowListCopyWindowInfo,
         kCGWindowListOptionOnScreenOnly,
+        kCGWindowListExcludeDesktopElements,
         kCGNullWindowID
     )
 
+    # Only on-screen windows, without the desktop and its icons
+    _WINDOW_LIST_OPTIONS = kCGWindowListOptionOnScreenOnly | kCGWindowListExcludeDesktopElements
+
+    class _FocusObserver(NSObject):
+        """Forwards NSWorkspace app activation notifications to a callback"""
+
+        def initWithCallback_(self, callback):
+            self = objc.super(_FocusObserver, self).init()
+            if self is None:
+                return None
+            self.callback = callback
+            return self
+
+        def activated_(self, notification):
+            self.callback()
+elif SYSTEM == "Linux":
+    from Xlib import X, display as xdisplay
+
+# Window title words that suggest a sensitive window (checked lower-cased)
+SENSITIVE_TITLE_TERMS = ("password", "login", "credential", "secure", "private", "credit card", "payment")
+
+# Patterns that suggest typed text is sensitive, compiled into one
+# alternation so each text is scanned once
+_SENSITIVE_TEXT_RE = re.compile(
+    r"\bpassword\b|\bpasswort\b|\bpwd\b"  # Passwords and credentials
+    r"|\d{4}[\s-]?\d{4}[\s-]?\d{4}[\s-]?\d{4}"  # Credit card patterns
+    r"|\d{3}[\s-]?\d{2}[\s-]?\d{4}",  # SSN patterns
+    re.IGNORECASE
+)
+
+# pynput key/button names, so events are looked up instead of formatted
+_KEY_NAMES = {key: key.name for key in keyboard.Key}
+_BUTTON_NAMES = {button: button.name for button in mouse.Button}
+
+def _wall_time(monotonic_ns):
+    """Convert a time.monotonic_ns() reading from an event to wall-clock seconds"""
+    return time.time() - (time.monotonic_ns() - monotonic_ns) / 1e9
+
+# Raw input events; time is a time.monotonic_ns() reading. Clicks and window
+# changes are put on input_queue, key presses are collected in a pending list
+# (see _on_key_press)
+KeyEvent = namedtuple("KeyEvent", "key time")
+ClickEvent = namedtuple("ClickEvent", "x y button time")
+WindowEvent = namedtuple("WindowEvent", "name title time")
+
+# The active app. Replaced as a whole on each switch, never updated field by
+# field, so other threads can read it without a lock
+CurrentApp = namedtuple("CurrentApp", "name title since")
+
+# An app the user switched away from. since is wall-clock seconds, duration
+# how long it stayed active
+AppVisit = namedtuple("AppVisit", "name title since duration")
+
+# Most raw events waiting for the processing thread; beyond this the oldest
+# are dropped, since recent input is what the context is for
+MAX_QUEUED_INPUTS = 1000
+
+# Queue markers for the processing thread
+_SHUTDOWN = object()
+_KEYS_PENDING = object()
+
 class InputMonitor:
     def __init__(self, context_size=100):
         """Initialize the input monitoring system"""
-        # Store recent interactions
+        # Store recent interactions. Keystroke text is kept UTF-8 encoded,
+        # which for mostly-ASCII typing is smaller than str
         self.recent_keystrokes = deque(maxlen=context_size)
+        # The last few of those that don't look sensitive, as handed out by
+        # get_context_data; filtered once when the text is committed
+        self._context_keystrokes = deque(maxlen=10)
         self.recent_clicks = deque(maxlen=20)
-        self.current_app = {"name": "", "title": "", "since": time.time()}
-        self.previous_apps = deque(maxlen=5)
+        self.current_app = CurrentApp("", "", time.time())
+        self.previous_apps = deque(maxlen=5)  # AppVisit tuples
+        # _is_sensitive_app() for current_app, worked out once per app switch
+        self._current_app_sensitive = False
         
-        # Processing queue
-        self.input_queue = queue.Queue()
+        # Processing queue. The listener callbacks and the window monitor only
+        # put raw events here; the processing thread is the only one that
+        # updates the state above and the text buffer
+        self.input_queue = queue.SimpleQueue()
+        # Held while the processing thread updates the recent_* deques,
+        # current_app and previous_apps, so get_context_data sees them whole
+        self._state_lock = threading.Lock()
         
         # Privacy settings
         self.excluded_apps = ["keychain", "password", "wallet", "1password", "lastpass", "bitwarden"]
@@ -40,9 +146,37 @@ class InputMonitor:
         self.privacy_mode = False
         
         # For text accumulation
-        self.current_text_buffer = ""
+        # Typed characters, joined only when the buffer is committed
+        self.text_buffer = []
+        self.text_buffer_len = 0
+        # Key presses not yet taken by the processing thread
+        self._pending_keys = []
+        self._keys_lock = threading.Lock()
+        # time.monotonic_ns() of the last buffered key press
         self.last_keystroke_time = 0
         self.keystroke_timeout = 2.0  # seconds
+        # Processing thread handlers, by raw event type
+        self._input_handlers = {
+            ClickEvent: self._handle_click,
+            WindowEvent: self._handle_window,
+        }
+        # Platform-specific window tracking, picked once
+        self._get_active_window_info = {
+            "Windows": self._get_active_window_info_windows,
+            "Darwin": self._get_active_window_info_macos,
+            "Linux": self._get_active_window_info_linux,
+        }.get(SYSTEM, self._get_active_window_info_unknown)
+        self._watch_focus = {
+            "Windows": self._watch_focus_windows,
+            "Darwin": self._watch_focus_macos,
+            "Linux": self._watch_focus_linux,
+        }.get(SYSTEM)
+        # Special keys that edit the text buffer, by key name
+        self._editing_keys = {
+            "space": self._on_space,
+            "enter": self._on_enter,
+            "backspace": self._on_backspace,
+        }
         
         # Monitoring state
         self.monitoring = False
@@ -50,6 +184,23 @@ class InputMonitor:
         self.listener_keyboard = None
         self.listener_mouse = None
         self.window_monitor_thread = None
+        # Set by the OS focus notification (or stop_monitoring) to wake the window monitor
+        self._focus_event = threading.Event()
+        self._focus_observer = None
+        self._win_event_thread_id = None
+        # Linux: the X connection used by the window monitor thread, and the
+        # write end of a pipe that wakes it from select()
+        self._x_display = None
+        self._x_wake_fd = None
+        # Last window reported by the monitor, so unchanged polls aren't queued
+        self._last_window = None
+        # macOS: frontmost app PID and the window info read for it, so a
+        # repeat activation of the same app skips the window list walk
+        self._last_pid = None
+        self._last_pid_info = None
+        # Windows: process names by (hwnd, pid), so a focus switch doesn't
+        # reopen the process every time
+        self._process_names = {}
         
         # Fallback mode for when accessibility permissions are not available
         self.fallback_mode = False
@@ -60,6 +211,7 @@ class InputMonitor:
             return
             
         self.monitoring = True
+        self._focus_event.clear()
         
         try:
             # Start keyboard listener
@@ -72,10 +224,9 @@ class InputMonitor:
             
             # Start mouse listener
             if self.click_logging_enabled:
-                self.listener_mouse = mouse.Listener(
-                    on_click=self._on_mouse_click,
-                    on_move=self._on_mouse_move
-                )
+                # No on_move: movement isn't recorded (privacy and performance),
+                # and a Python callback per pixel of motion isn't free
+                self.listener_mouse = mouse.Listener(on_click=self._on_mouse_click)
                 self.listener_mouse.start()
             
             # Start window monitor
@@ -89,7 +240,8 @@ class InputMonitor:
             self.fallback_mode = True
             
             # Set some default values for testing
-            self.current_app = {"name": "Test App", "title": "Test Window", "since": time.time()}
+            self.current_app = CurrentApp("Test App", "Test Window", time.time())
+            self._current_app_sensitive = self._is_sensitive_app()
             self.recent_activity = ["Testing application", "Creating test topics"]
         
         # Start the processing thread
@@ -101,6 +253,16 @@ class InputMonitor:
         """Stop all monitoring activities"""
         self.monitoring = False
         
+        # Let the processing thread drain the queue and exit
+        self.input_queue.put(_SHUTDOWN)
+        
+        # Wake the window monitor so it can see monitoring is off
+        self._focus_event.set()
+        if self._win_event_thread_id is not None:
+            user32.PostThreadMessageW(self._win_event_thread_id, WM_QUIT, 0, 0)
+        if self._x_wake_fd is not None:
+            os.write(self._x_wake_fd, b"\0")
+        
         if self.listener_keyboard:
             self.listener_keyboard.stop()
             self.listener_keyboard = None
@@ -122,70 +284,69 @@ class InputMonitor:
         """Handle key press events"""
         if not self.monitoring or self.privacy_mode:
             return
-            
-        # Check if we should be logging keystrokes in the current app
-        if self._is_sensitive_app():
-            return
-            
-        try:
-            # For regular characters
-            if hasattr(key, 'char') and key.char:
-                char = key.char
-                self._add_to_text_buffer(char)
-            # For special keys
-            else:
-                key_name = str(key).replace("Key.", "")
-                
-                # Handle common editing keys
-                if key_name == "space":
-                    self._add_to_text_buffer(" ")
-                elif key_name == "enter":
-                    # Commit the current buffer as it's likely a complete thought
-                    self._commit_text_buffer(True)
-                elif key_name == "backspace":
-                    # Handle backspace by removing last character
-                    if self.current_text_buffer:
-                        self.current_text_buffer = self.current_text_buffer[:-1]
-                else:
-                    # Just note the special key press but don't add to text buffer
-                    self.input_queue.put({"type": "special_key", "key": key_name, "time": time.time()})
-                    
-        except Exception as e:
-            print(f"Error processing keystroke: {e}")
+        
+        # Hand the key to the processing thread, pynput misses events when
+        # its callbacks are slow. A burst of typing is one queue item: only
+        # the first key since the processing thread last took them is signalled
+        with self._keys_lock:
+            self._pending_keys.append(KeyEvent(key, time.monotonic_ns()))
+            first = len(self._pending_keys) == 1
+        if first:
+            self._queue_input(_KEYS_PENDING)
     
     def _on_key_release(self, key):
         """Handle key release events"""
         # Not doing anything special on key release for now
         pass
     
-    def _add_to_text_buffer(self, char):
+    def _queue_input(self, event):
+        """Queue a raw event, dropping the oldest one if the processing thread has fallen behind"""
+        input_queue = self.input_queue
+        if input_queue.qsize() >= MAX_QUEUED_INPUTS:
+            try:
+                dropped = input_queue.get_nowait()
+            except queue.Empty:
+                dropped = None  # The processing thread caught up
+            # Markers aren't inputs, they have to reach the processing thread:
+            # without _KEYS_PENDING the pending keys would never be taken
+            if dropped is _SHUTDOWN or dropped is _KEYS_PENDING:
+                input_queue.put(dropped)
+        input_queue.put(event)
+    
+    def _add_to_text_buffer(self, char, event_time):
         """Add character to the current text buffer"""
-        self.current_text_buffer += char
-        self.last_keystroke_time = time.time()
+        self.text_buffer.append(char)
+        self.text_buffer_len += len(char)
+        self.last_keystroke_time = event_time
         
     def _commit_text_buffer(self, force=False):
         """Commit the current text buffer if it's meaningful"""
-        current_time = time.time()
+        idle_ns = time.monotonic_ns() - self.last_keystroke_time
         
         # Only commit if buffer has content and enough time has passed or force commit
-        if self.current_text_buffer and (force or current_time - self.last_keystroke_time > self.keystroke_timeout):
-            if len(self.current_text_buffer.strip()) > 3:  # Only record meaningful text
-                self.recent_keystrokes.append({
-                    "text": self.current_text_buffer,
-                    "app": self.current_app["name"],
-                    "time": current_time
-                })
-                
-                # Add to processing queue
-                self.input_queue.put({
-                    "type": "text_input",
-                    "text": self.current_text_buffer,
-                    "app": self.current_app["name"],
-                    "time": current_time
-                })
+        if self.text_buffer and (force or idle_ns > self.keystroke_timeout * 1e9):
+            # Too short to be meaningful even before stripping, so skip the join
+            text = "".join(self.text_buffer) if self.text_buffer_len > 3 else ""
+            if len(text.strip()) > 3:  # Only record meaningful text
+                app_name = self.current_app.name
+                current_time = time.time()
+                safe = not self._is_likely_sensitive(text)
+                with self._state_lock:
+                    self.recent_keystrokes.append({
+                        "text": text.encode("utf-8", "replace"),
+                        "app": app_name,
+                        "time": current_time
+                    })
+                    if safe:
+                        self._context_keystrokes.append({
+                            "text": text,
+                            "app": app_name,
+                            "time": current_time
+                        })
             
             # Clear the buffer
-            self.current_text_buffer = ""
+            self.text_buffer.clear()
+            self.text_buffer_len = 0
     
     def _on_mouse_click(self, x, y, button, pressed):
         """Handle mouse click events"""
@@ -193,140 +354,412 @@ class InputMonitor:
             return
             
         if pressed:  # Only capture press, not release
-            click_info = {
-                "x": x, 
-                "y": y,
-                "button": str(button).replace("Button.", ""),
-                "app": self.current_app["name"],
-                "time": time.time()
-            }
-            
-            self.recent_clicks.append(click_info)
-            self.input_queue.put({"type": "mouse_click", "data": click_info})
-            
-            # Commit any pending text when user clicks
-            self._commit_text_buffer()
-    
-    def _on_mouse_move(self, x, y):
-        """Handle mouse movement"""
-        # Not storing every movement for privacy and performance reasons
-        # Could implement to track general activity levels
-        pass
+            self._queue_input(ClickEvent(x, y, button, time.monotonic_ns()))
     
     def _monitor_active_window(self):
-        """Monitor the currently active window/application"""
+        """Monitor the currently active window/application.
+
+        Waits for the OS to report a focus change instead of polling, where
+        the platform has a notification for it.
+        """
+        if self._watch_focus:
+            try:
+                self._watch_focus()
+                return
+            except Exception as e:
+                print(f"Focus notifications unavailable, polling instead: {e}")
+        
+        self._poll_active_window()
+    
+    def _watch_focus_macos(self):
+        """Wait on NSWorkspace app activation notifications"""
+        observer = _FocusObserver.alloc().initWithCallback_(self._focus_event.set)
+        NSWorkspace.sharedWorkspace().notificationCenter().addObserver_selector_name_object_(
+            observer, "activated:", "NSWorkspaceDidActivateApplicationNotification", None
+        )
+        # Keep a reference, the notification center doesn't retain its observers
+        self._focus_observer = observer
+        
+        try:
+            # NSWorkspace posts on the main thread, whose run loop Tk is already
+            # pumping, so the observer only has to wake this thread
+            self._check_active_window()
+            while self.monitoring:
+                self._focus_event.wait()
+                self._focus_event.clear()
+                if self.monitoring:
+                    self._check_active_window()
+        finally:
+            NSWorkspace.sharedWorkspace().notificationCenter().removeObserver_(observer)
+            self._focus_observer = None
+    
+    def _watch_focus_windows(self):
+        """Pump EVENT_SYSTEM_FOREGROUND events from a WinEvent hook"""
+        def on_foreground(hook, event, hwnd, id_object, id_child, thread_id, event_time):
+            self._check_active_window()
+        
+        # The ctypes callback must stay referenced for as long as the hook exists
+        callback = WinEventProc(on_foreground)
+        hook = user32.SetWinEventHook(
+            EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_FOREGROUND,
+            0, callback, 0, 0, WINEVENT_OUTOFCONTEXT
+        )
+        if not hook:
+            raise ctypes.WinError()
+        
+        # Out-of-context hooks are delivered through this thread's message queue
+        self._win_event_thread_id = kernel32.GetCurrentThreadId()
+        try:
+            self._check_active_window()
+            msg = ctypes.wintypes.MSG()
+            while self.monitoring and user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+        finally:
+            self._win_event_thread_id = None
+            user32.UnhookWinEvent(hook)
+    
+    def _watch_focus_linux(self):
+        """Wait for PropertyNotify on _NET_ACTIVE_WINDOW and the active window's title"""
+        display = self._get_x_display()
+        root = display.screen().root
+        # get_atom caches, so the lookups in _get_active_window_info_linux are free
+        net_active_window = display.get_atom("_NET_ACTIVE_WINDOW")
+        net_wm_name = display.get_atom("_NET_WM_NAME")
+        # Active window changes are announced as property changes on the root
+        root.change_attributes(event_mask=X.PropertyChangeMask)
+        
+        wake_r, self._x_wake_fd = os.pipe()
+        try:
+            self._check_active_window()
+            while self.monitoring:
+                # Xlib may already have read events off the socket
+                if not display.pending_events():
+                    readable, _, _ = select.select([display.fileno(), wake_r], [], [])
+                    if wake_r in readable:
+                        break
+                
+                changed = False
+                while display.pending_events():
+                    event = display.next_event()
+                    if event.type == X.PropertyNotify and event.atom in (net_active_window, net_wm_name):
+                        changed = True
+                if changed:
+                    self._check_active_window()
+        finally:
+            os.close(self._x_wake_fd)
+            os.close(wake_r)
+            self._x_wake_fd = None
+    
+    def _get_x_display(self):
+        """Open the X connection on first use (window monitor thread only)"""
+        if self._x_display is None:
+            display = xdisplay.Display()
+            # Windows can vanish between an event and our requests about them;
+            # those errors are expected and not worth printing
+            display.set_error_handler(lambda *args: None)
+            self._x_display = display
+        return self._x_display
+    
+    def _poll_active_window(self):
+        """Poll the active window on platforms without a focus notification"""
         while self.monitoring:
-            if not self.privacy_mode and self.window_logging_enabled:
-                try:
-                    current_app_info = self._get_active_window_info()
-                    
-                    # If the application changed
-                    if current_app_info["name"] != self.current_app["name"] or \
-                       current_app_info["title"] != self.current_app["title"]:
-                        
-                        # Store the previous app if it was open for more than 3 seconds
-                        if time.time() - self.current_app["since"] > 3:
-                            self.previous_apps.append(self.current_app)
-                        
-                        # Update current app
-                        self.current_app = {
-                            "name": current_app_info["name"],
-                            "title": current_app_info["title"],
-                            "since": time.time()
-                        }
-                        
-                        # Add to queue
-                        self.input_queue.put({
-                            "type": "app_switch",
-                            "from": self.previous_apps[-1]["name"] if self.previous_apps else None,
-                            "to": current_app_info["name"],
-                            "title": current_app_info["title"],
-                            "time": time.time()
-                        })
-                        
-                        # Commit any pending text when switching apps
-                        self._commit_text_buffer()
-                    
-                except Exception as e:
-                    print(f"Error monitoring active window: {e}")
+            # Polling is what catches title changes within one app, so
+            # don't answer from the per-PID cache
+            self._last_pid = None
+            self._check_active_window()
             
             # Check every second - adjust as needed
-            time.sleep(1)
+            self._focus_event.wait(1)
+    
+    def _check_active_window(self):
+        """Read the active window and queue it if it changed"""
+        if self.privacy_mode or not self.window_logging_enabled:
+            return
+        
+        try:
+            current_app_info = self._get_active_window_info()
+            window = (current_app_info["name"], current_app_info["title"])
+            if window != self._last_window:
+                self._last_window = window
+                self._queue_input(WindowEvent(current_app_info["name"], current_app_info["title"], time.monotonic_ns()))
+            
+        except Exception as e:
+            print(f"Error monitoring active window: {e}")
+    
+    def _get_active_window_info_windows(self):
+        """Get information about the active window on Windows"""
+        result = {"name": "unknown", "title": "unknown"}
+        
+        hwnd = user32.GetForegroundWindow()
+        if hwnd:
+            length = user32.GetWindowTextLengthW(hwnd)
+            buffer = ctypes.create_unicode_buffer(length + 1)
+            user32.GetWindowTextW(hwnd, buffer, length + 1)
+            title = buffer.value
+            result["title"] = title
+            # Use the process name, or failing that the app name from the window title
+            result["name"] = self._windows_process_name(hwnd) or \
+                (title.split(" - ")[-1] if " - " in title else title)
+        
+        return result
     
-    def _get_active_window_info(self):
-        """Get information about the currently active window"""
+    def _get_active_window_info_macos(self):
+        """Get information about the active window on macOS"""
+        result = {"name": "unknown", "title": "unknown"}
+        
+        active_app = NSWorkspace.sharedWorkspace().frontmostApplication()
+        if active_app:
+            # The PID is a cheap check; the window list walk below is not
+            pid = active_app.processIdentifier()
+            if pid == self._last_pid:
+                return dict(self._last_pid_info)
+            
+            result["name"] = active_app.localizedName()
+            
+            # Try to get window title - more complex on macOS
+            window_info = CGWindowListCopyWindowInfo(_WINDOW_LIST_OPTIONS, kCGNullWindowID)
+            for info in window_info:
+                if info.get('kCGWindowOwnerPID') == pid:
+                    result["title"] = info.get('kCGWindowName', 'unknown')
+                    break
+            
+            self._last_pid = pid
+            self._last_pid_info = dict(result)
+        
+        return result
+    
+    def _get_active_window_info_linux(self):
+        """Get information about the active window on Linux (X11)"""
         result = {"name": "unknown", "title": "unknown"}
         
         try:
-            if platform.system() == "Windows":
-                # Windows implementation
-                active_window = gw.getActiveWindow()
-                if active_window:
-                    result["title"] = active_window.title
-                    # Extract app name from window title or process name
-                    result["name"] = active_window.title.split(" - ")[-1] if " - " in active_window.title else active_window.title
+            display = self._get_x_display()
+            root = display.screen().root
+            active = root.get_full_property(display.get_atom("_NET_ACTIVE_WINDOW"), X.AnyPropertyType)
+            if active and active.value[0]:
+                window = display.create_resource_object("window", active.value[0])
+                # Also listen for title changes on the active window
+                window.change_attributes(event_mask=X.PropertyChangeMask)
                 
-            elif platform.system() == "Darwin":  # macOS
-                # macOS implementation
-                active_app = NSWorkspace.sharedWorkspace().activeApplication()
-                if active_app:
-                    result["name"] = active_app['NSApplicationName']
-                    
-                    # Try to get window title - more complex on macOS
-                    window_info = CGWindowListCopyWindowInfo(kCGWindowListOptionOnScreenOnly, kCGNullWindowID)
-                    for info in window_info:
-                        if info.get('kCGWindowOwnerName') == result["name"]:
-                            result["title"] = info.get('kCGWindowName', 'unknown')
-                            break
-            
-            elif platform.system() == "Linux":
-                # Basic Linux implementation - would need enhancement
-                # This is a simplified approach that might not work on all Linux distros
-                try:
-                    import subprocess
-                    cmd = "xdotool getwindowfocus getwindowname"
-                    title = subprocess.check_output(cmd, shell=True).decode().strip()
-                    result["title"] = title
+                name = window.get_full_property(
+                    display.get_atom("_NET_WM_NAME"), display.get_atom("UTF8_STRING")
+                )
+                if name:
+                    title = name.value.decode("utf-8", "replace")
+                else:
+                    title = window.get_wm_name() or "unknown"
+                result["title"] = title
+                
+                # WM_CLASS holds (instance, class); the class is the app name
+                wm_class = window.get_wm_class()
+                if wm_class:
+                    result["name"] = wm_class[1]
+                else:
                     result["name"] = title.split(" - ")[-1] if " - " in title else title
-                except:
-                    pass
-        
-        except Exception as e:
-            print(f"Error getting active window: {e}")
+        except Exception:
+            # No X server (e.g. a Wayland session without XWayland)
+            pass
         
         return result
     
+    def _get_active_window_info_unknown(self):
+        """No window tracking on other platforms"""
+        return {"name": "unknown", "title": "unknown"}
+    
+    def _windows_process_name(self, hwnd):
+        """Get the executable name (without .exe) of the process owning a window"""
+        pid = ctypes.wintypes.DWORD()
+        user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+        key = (hwnd, pid.value)
+        if key in self._process_names:
+            return self._process_names[key]
+        
+        name = None
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid.value)
+        if handle:
+            try:
+                size = ctypes.wintypes.DWORD(260)
+                buffer = ctypes.create_unicode_buffer(size.value)
+                if kernel32.QueryFullProcessImageNameW(handle, 0, buffer, ctypes.byref(size)):
+                    name = os.path.splitext(os.path.basename(buffer.value))[0]
+            finally:
+                kernel32.CloseHandle(handle)
+        
+        # Windows come and go, so don't let this grow without bound
+        if len(self._process_names) >= 256:
+            self._process_names.clear()
+        self._process_names[key] = name
+        return name
+    
     def _process_inputs(self):
         """Process the input queue"""
-        while self.monitoring:
+        while True:
             try:
-                # Check for text buffer timeout
-                current_time = time.time()
-                if self.current_text_buffer and current_time - self.last_keystroke_time > self.keystroke_timeout:
-                    self._commit_text_buffer()
+                # Block until something arrives, or until a pending text
+                # buffer is due to be committed
+                timeout = None
+                if self.text_buffer:
+                    idle = (time.monotonic_ns() - self.last_keystroke_time) / 1e9
+                    timeout = max(0.0, self.keystroke_timeout - idle)
                 
-                # Process any queued inputs
                 try:
-                    # Non-blocking get with timeout
-                    item = self.input_queue.get(timeout=0.5)
-                    # Process the input item - for now just storing in memory
-                    # Later, this could feed into an analysis system
+                    batch = [self.input_queue.get(timeout=timeout)]
                 except queue.Empty:
+                    self._commit_text_buffer()
                     continue
+                
+                # Take everything else that's waiting in the same wakeup
+                try:
+                    while True:
+                        batch.append(self.input_queue.get_nowait())
+                except queue.Empty:
+                    pass
+                
+                if not self._process_batch(batch):
+                    break
             
             except Exception as e:
                 print(f"Error processing input: {e}")
+    
+    def _process_batch(self, batch):
+        """Handle a batch of queued items; returns False once _SHUTDOWN is reached"""
+        last = len(batch) - 1
+        for i, item in enumerate(batch):
+            if item is _SHUTDOWN:
+                return False
+            if i < last and self._is_superseded(item, batch[i + 1]):
+                continue
             
-            # Sleep briefly to reduce CPU usage
-            time.sleep(0.1)
+            try:
+                self._handle_input(item)
+            except Exception as e:
+                print(f"Error processing input: {e}")
+        return True
     
-    def _is_sensitive_app(self):
-        """Check if the current app is in the sensitive/excluded list"""
-        if not self.current_app:
+    def _is_superseded(self, event, following):
+        """Check whether a window change can be dropped in favour of the next one
+        
+        That's the case when the next window came within the 3 seconds an app
+        needs to be kept in previous_apps, and nothing was typed in between.
+        """
+        if type(event) is not WindowEvent or type(following) is not WindowEvent:
             return False
+        if following.time - event.time > 3e9:
+            return False
+        with self._keys_lock:
+            return not self._pending_keys or self._pending_keys[0].time > following.time
+    
+    def _handle_input(self, event):
+        """Apply one raw input event to the monitor state"""
+        if event is _KEYS_PENDING:
+            self._handle_keys(self._take_pending_keys())
+            return
+        
+        # Keys typed before this event have to be applied first
+        if self._pending_keys:
+            self._handle_keys(self._take_pending_keys(until=event.time))
+        self._input_handlers[type(event)](event)
+    
+    def _take_pending_keys(self, until=None):
+        """Take the pending key presses, or only those up to a monotonic time"""
+        with self._keys_lock:
+            keys = self._pending_keys
+            if until is not None:
+                split = len(keys)
+                while split and keys[split - 1].time > until:
+                    split -= 1
+                keys, self._pending_keys = keys[:split], keys[split:]
+                remaining = bool(self._pending_keys)
+            else:
+                self._pending_keys = []
+                remaining = False
+        
+        # The marker for the keys left behind may already have been handled,
+        # and keys added to a non-empty list don't send another
+        if remaining:
+            self._queue_input(_KEYS_PENDING)
+        return keys
+    
+    def _handle_keys(self, keys):
+        """Apply a run of key presses in order"""
+        for event in keys:
+            self._handle_key(event)
+    
+    def _handle_key(self, event):
+        """Update the text buffer for a key press"""
+        key, event_time = event
+        # Check if we should be logging keystrokes in the current app
+        if self._current_app_sensitive:
+            return
+            
+        try:
+            # For regular characters
+            if hasattr(key, 'char') and key.char:
+                self._add_to_text_buffer(key.char, event_time)
+            # For special keys
+            else:
+                # Handle common editing keys, other special keys aren't recorded
+                handler = self._editing_keys.get(_KEY_NAMES.get(key))
+                if handler:
+                    handler(event_time)
+                    
+        except Exception as e:
+            print(f"Error processing keystroke: {e}")
+    
+    def _on_space(self, event_time):
+        self._add_to_text_buffer(" ", event_time)
+    
+    def _on_enter(self, event_time):
+        # Commit the current buffer as it's likely a complete thought
+        self._commit_text_buffer(True)
+    
+    def _on_backspace(self, event_time):
+        # Handle backspace by removing last character
+        if self.text_buffer:
+            self.text_buffer_len -= len(self.text_buffer.pop())
+    
+    def _handle_click(self, event):
+        """Record a mouse click"""
+        click_info = {
+            "x": event.x, 
+            "y": event.y,
+            "button": _BUTTON_NAMES.get(event.button, "unknown"),
+            "app": self.current_app.name,
+            "time": _wall_time(event.time)
+        }
+        
+        with self._state_lock:
+            self.recent_clicks.append(click_info)
+        
+        # Commit any pending text when user clicks
+        self._commit_text_buffer()
+    
+    def _handle_window(self, event):
+        """Record an app switch if the active window changed"""
+        current = self.current_app
+        if event.name == current.name and event.title == current.title:
+            return
+        
+        since = _wall_time(event.time)
+        with self._state_lock:
+            # Store the previous app if it was open for more than 3 seconds
+            duration = since - current.since
+            if duration > 3:
+                self.previous_apps.append(AppVisit(current.name, current.title, current.since, duration))
             
-        app_name = self.current_app["name"].lower()
-        title = self.current_app["title"].lower()
+            # Update current app
+            self.current_app = CurrentApp(event.name, event.title, since)
+        self._current_app_sensitive = self._is_sensitive_app()
+        
+        # Commit any pending text when switching apps
+        self._commit_text_buffer()
+    
+    def _is_sensitive_app(self):
+        """Check if the current app is in the sensitive/excluded list"""
+        current = self.current_app
+        app_name = current.name.lower()
+        title = current.title.lower()
         
         # Check against excluded apps list
         for excluded in self.excluded_apps:
@@ -334,8 +767,7 @@ class InputMonitor:
                 return True
         
         # Additional checks for sensitive windows
-        sensitive_terms = ["password", "login", "credential", "secure", "private", "credit card", "payment"]
-        for term in sensitive_terms:
+        for term in SENSITIVE_TITLE_TERMS:
             if term in title:
                 return True
                 
@@ -345,24 +777,29 @@ class InputMonitor:
         """Get the current context data for analysis"""
         if self.fallback_mode:
             # Return mock data for testing
+            recent_activity = self.recent_activity
+        else:
+            # Normal operation
+            recent_activity = self._get_recent_activity()
+        
+        # Copy under the lock so the processing thread can't change the
+        # deques mid-copy
+        with self._state_lock:
             return {
-                "current_app": self.current_app,
-                "recent_activity": self.recent_activity,
-                "recent_keystrokes": list(self.recent_keystrokes)[-10:],
+                "current_app": self.current_app._asdict(),
+                "recent_activity": recent_activity,
+                "recent_keystrokes": list(self._context_keystrokes),
                 "recent_clicks": list(self.recent_clicks)[-5:],
-                "previous_apps": list(self.previous_apps),
+                "previous_apps": [visit._asdict() for visit in self.previous_apps],
                 "privacy_mode": self.privacy_mode
             }
-        
-        # Normal operation
-        return {
-            "current_app": self.current_app,
-            "recent_activity": self._get_recent_activity(),
-            "recent_keystrokes": list(self.recent_keystrokes)[-10:],
-            "recent_clicks": list(self.recent_clicks)[-5:],
-            "previous_apps": list(self.previous_apps),
-            "privacy_mode": self.privacy_mode
-        }
+    
+    def get_context_bytes(self):
+        """Get the current context data as UTF-8 JSON, ready to send"""
+        context = self.get_context_data()
+        if orjson is not None:
+            return orjson.dumps(context)
+        return json.dumps(context, ensure_ascii=False).encode("utf-8")
     
     def _get_recent_activity(self):
         """Get a recent activity description"""
@@ -371,19 +808,4 @@ class InputMonitor:
     
     def _is_likely_sensitive(self, text):
         """Check if text is likely sensitive and should be excluded"""
-        # Check for patterns that suggest sensitive information
-        sensitive_patterns = [
-            # Passwords and credentials
-            r"\bpassword\b", r"\bpasswort\b", r"\bpwd\b", 
-            # Credit card patterns
-            r"\d{4}[\s-]?\d{4}[\s-]?\d{4}[\s-]?\d{4}", 
-            # SSN patterns
-            r"\d{3}[\s-]?\d{2}[\s-]?\d{4}"
-        ]
-        
-        import re
-        for pattern in sensitive_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                return True
-        
-        return False 
\ No newline at end of file
+        return _SENSITIVE_TEXT_RE.search(text) is not None
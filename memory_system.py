@@ -5,31 +5,88 @@ import sqlite3
 import datetime
 from pathlib import Path
 import re
-from anthropic import Anthropic
 from dotenv import load_dotenv
+import atexit
 import threading
 import queue
 from collections import Counter
 import logging
+from contextlib import contextmanager
 from typing import List, Dict, Any, Optional
 
 load_dotenv()
 
 class SmartMemorySystem:
-    def __init__(self, db_path="./memory.db", relevance_threshold=0.6):
+    # PRAGMAs applied to every connection unless overridden via pragmas=
+    DEFAULT_PRAGMAS = {
+        # WAL lets readers (the UI) proceed while the analysis thread writes;
+        # NORMAL sync is crash-safe under WAL and skips an fsync per commit
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "temp_store": "MEMORY",
+        "mmap_size": 268435456,
+        "cache_size": -16000,  # 16 MiB page cache (negative = KiB)
+    }
+    
+    # File-only PRAGMAs, skipped for in-memory databases
+    FILE_PRAGMAS = ("journal_mode", "mmap_size")
+    
+    # Deferred insight inserts are written once this many are pending, or
+    # once the oldest has waited this long
+    PENDING_FLUSH_SIZE = 32
+    PENDING_FLUSH_SECONDS = 5.0
+    
+    INSERT_MEMORY_SQL = '''
+    INSERT INTO memories 
+    (content, source, timestamp, relevance_score, context, app_name, topics) 
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    '''
+    
+    def __init__(self, db_path="./memory.db", relevance_threshold=0.6, pragmas=None):
         """Initialize the memory system
         
         Args:
             db_path: Path to SQLite database file
             relevance_threshold: Threshold for relevance (0.0-1.0)
+            pragmas: Optional SQLite PRAGMA settings applied to every connection
+                on top of DEFAULT_PRAGMAS (e.g. {"synchronous": "NORMAL"})
         """
         self.db_path = db_path
         self.relevance_threshold = relevance_threshold
-        self.claude_client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+        self.pragmas = {**self.DEFAULT_PRAGMAS, **(pragmas or {})}
+        if db_path == ":memory:" or db_path.startswith("file::memory:"):
+            for name in self.FILE_PRAGMAS:
+                self.pragmas.pop(name, None)
+        
+        # Anthropic client, created on first use (see the claude_client property)
+        self._claude_client = None
+        self._claude_available = True
         
         # Initialize threading lock
         self.lock = threading.Lock()
         
+        # Whether SQLite has FTS5 for query searches; set by _init_db()
+        self._fts_available = False
+        
+        # Sorted list returned by get_all_categories(); None until first use
+        # and after writes that may remove categories
+        self._categories_cache = None
+        
+        # SQL text for the filtered listing queries, keyed by which filters are set
+        self._stmt_cache = {}
+        
+        # Insight rows queued by store_insight(defer=True), written together
+        # by flush_pending()
+        self._pending_inserts = []
+        self._pending_since = None
+        self._pending_lock = threading.Lock()
+        atexit.register(self.flush_pending)
+        
+        # Per-thread state: the thread's connection (see _connect) and the
+        # transaction of an open batch() block
+        self._local = threading.local()
+        
         # Processing queue for async operations
         self.processing_queue = queue.Queue()
         
@@ -56,10 +113,51 @@ class SmartMemorySystem:
             'or', 'an', 'will', 'my', 'one', 'all', 'would', 'there', 'their', 'what'
         ])
 
+    @property
+    def claude_client(self):
+        """Anthropic client, or None if the anthropic package isn't installed
+        
+        Created on first use so the slow SDK import stays off startup.
+        """
+        if self._claude_client is None and self._claude_available:
+            try:
+                from anthropic import Anthropic
+                self._claude_client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+            except ImportError as e:
+                logging.warning(f"anthropic package unavailable, summaries disabled: {e}")
+                self._claude_available = False
+        return self._claude_client
+    
+    def _connect(self):
+        """This thread's database connection, opened with the configured
+        pragmas on first use and reused after that
+        
+        Hand it back with _release() rather than closing it.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            for name, value in self.pragmas.items():
+                conn.execute(f"PRAGMA {name}={value}")
+            self._local.conn = conn
+        elif conn.in_transaction and conn is not getattr(self._local, "batch_conn", None):
+            # Left open by a call that raised before committing
+            conn.rollback()
+        return conn
+    
+    def _release(self, conn):
+        """Finish with a connection from _connect()
+        
+        Uncommitted writes are rolled back, as closing the connection used
+        to do, unless they belong to an open batch() transaction.
+        """
+        if conn.in_transaction and conn is not getattr(self._local, "batch_conn", None):
+            conn.rollback()
+    
     def _init_db(self):
         """Initialize the SQLite database"""
         with self.lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             # Create tables if they don't exist
@@ -119,10 +217,105 @@ class SmartMemorySystem:
             # Index for faster topic search
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_memories_topics ON memories (topics)')
             
+            # Date-filtered listings scan by timestamp and test topics from the index
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_memories_timestamp_topics ON memories (timestamp, topics)')
+            
+            # Full-text indexes for query searches in retrieve_relevant_memories
+            try:
+                for table in ("memories", "consolidated_memories"):
+                    self._create_fts_index(cursor, table)
+                self._fts_available = True
+            except sqlite3.OperationalError as e:
+                logging.warning(f"SQLite FTS5 unavailable, searching with LIKE: {e}")
+                self._fts_available = False
+            
             conn.commit()
-            conn.close()
+            self._release(conn)
     
-    def store_insight(self, content, source=None, context=None, app_name=None, analyze_now=False, topics=None):
+    def _create_fts_index(self, cursor, table):
+        """Create the FTS5 index over a table's content and topics, kept in
+        sync by triggers, and fill it if it's new"""
+        fts = f"{table}_fts"
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,))
+        exists = cursor.fetchone() is not None
+        
+        cursor.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            content, topics, content='{table}', content_rowid='id', tokenize='porter unicode61'
+        )
+        ''')
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts} (rowid, content, topics) VALUES (new.id, new.content, new.topics);
+        END
+        ''')
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, content, topics) VALUES ('delete', old.id, old.content, old.topics);
+        END
+        ''')
+        # Only content and topics are indexed, so access count updates skip this
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF content, topics ON {table} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, content, topics) VALUES ('delete', old.id, old.content, old.topics);
+            INSERT INTO {fts} (rowid, content, topics) VALUES (new.id, new.content, new.topics);
+        END
+        ''')
+        
+        if not exists:
+            # Index rows stored before the index existed
+            cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+    
+    @staticmethod
+    def _fts_query(query):
+        """Turn free text into an FTS5 phrase query, with the last word
+        matched as a prefix (like the substring search it replaces)"""
+        return '"' + query.replace('"', '""') + '"*'
+    
+    @contextmanager
+    def batch(self):
+        """Group the writes made inside the block into a single transaction
+        
+        Writes on the same thread share one connection and are committed
+        together when the outermost block exits (rolled back on error).
+        """
+        if getattr(self._local, "batch_conn", None) is not None:
+            # Nested block joins the outer transaction
+            yield
+            return
+        
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.batch_conn = conn
+        try:
+            yield
+            # Deferred inserts ride along in this transaction
+            self.flush_pending()
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            # Topics cached from the rolled-back inserts may not exist
+            self._categories_cache = None
+            raise
+        finally:
+            self._local.batch_conn = None
+    
+    @contextmanager
+    def _write_connection(self):
+        """Connection for a write; commits on exit unless inside batch()"""
+        conn = getattr(self._local, "batch_conn", None)
+        if conn is not None:
+            yield conn
+            return
+        
+        conn = self._connect()
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            self._release(conn)
+    
+    def store_insight(self, content, source=None, context=None, app_name=None, analyze_now=False, topics=None, defer=False):
         """Store an insight or notification with optional immediate analysis
         
         Args:
@@ -132,9 +325,12 @@ class SmartMemorySystem:
             app_name: The application the user was using
             analyze_now: If True, analyze synchronously; otherwise queue for async
             topics: Optional predefined topics to use instead of extracting them
+            defer: With topics, queue the insert to be written in bulk by
+                flush_pending() instead of immediately
         
         Returns:
-            memory_id if stored, None if rejected as irrelevant or duplicate
+            memory_id if stored, "queued" if queued, None if rejected as
+            irrelevant or duplicate
         """
         # Generate a simple hash of the content to check for near-duplicates
         content_hash = hash(content[:100])  # First 100 chars for approximate matching
@@ -163,18 +359,10 @@ class SmartMemorySystem:
         
         # If topics are provided, use them directly
         if topics:
-            # Store in database with provided topics
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             # Calculate a default relevance score
             relevance_score = 0.8  # High relevance for manually tagged content
             
-            cursor.execute('''
-            INSERT INTO memories 
-            (content, source, timestamp, relevance_score, context, app_name, topics) 
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
+            row = (
                 content, 
                 source, 
                 memory_data.get("timestamp"), 
@@ -182,12 +370,25 @@ class SmartMemorySystem:
                 context,
                 app_name,
                 json.dumps(topics)
-            ))
+            )
             
-            memory_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+            if defer:
+                with self._pending_lock:
+                    self._pending_inserts.append(row)
+                    if self._pending_since is None:
+                        self._pending_since = time.monotonic()
+                    full = len(self._pending_inserts) >= self.PENDING_FLUSH_SIZE
+                if full:
+                    self.flush_pending()
+                return "queued"
+            
+            # Store in database with provided topics
+            with self._write_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(self.INSERT_MEMORY_SQL, row)
+                memory_id = cursor.lastrowid
             
+            self._add_categories(topics)
             return memory_id
         
         if analyze_now:
@@ -234,6 +435,35 @@ class SmartMemorySystem:
         # If the content passes basic checks or has actionable language, proceed with deeper analysis
         return has_actionable or len(content) > 30
     
+    def flush_pending(self):
+        """Write all deferred insight inserts with a single executemany
+        
+        Joins the caller's batch() transaction if one is active.
+        
+        Returns:
+            Number of insights written
+        """
+        with self._pending_lock:
+            rows, self._pending_inserts = self._pending_inserts, []
+            self._pending_since = None
+        if not rows:
+            return 0
+        
+        try:
+            with self._write_connection() as conn:
+                conn.executemany(self.INSERT_MEMORY_SQL, rows)
+        except Exception as e:
+            logging.error(f"Error writing pending insights: {e}")
+            # Keep them for the next flush
+            with self._pending_lock:
+                self._pending_inserts[:0] = rows
+                if self._pending_since is None:
+                    self._pending_since = time.monotonic()
+            return 0
+        
+        self._add_categories({topic for row in rows for topic in json.loads(row[6])})
+        return len(rows)
+    
     def _analyze_and_store(self, memory_data):
         """Analyze content relevance and store if sufficiently relevant"""
         content = memory_data["content"]
@@ -249,26 +479,21 @@ class SmartMemorySystem:
             topics = self._extract_topics(content, context)
             
             # Store in database
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-            INSERT INTO memories 
-            (content, source, timestamp, relevance_score, context, app_name, topics) 
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                content, 
-                memory_data.get("source"), 
-                memory_data.get("timestamp"), 
-                relevance_score,
-                context,
-                app_name,
-                json.dumps(topics)
-            ))
+            with self._write_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(self.INSERT_MEMORY_SQL, (
+                    content, 
+                    memory_data.get("source"), 
+                    memory_data.get("timestamp"), 
+                    relevance_score,
+                    context,
+                    app_name,
+                    json.dumps(topics)
+                ))
+                
+                memory_id = cursor.lastrowid
             
-            memory_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+            self._add_categories(topics)
             
             # If we have enough memories, trigger consolidation (but not too often)
             self._maybe_trigger_consolidation()
@@ -325,47 +550,25 @@ class SmartMemorySystem:
         # Extract potential topics
         potential_topics = self._simple_topic_extraction(content)
         
-        # Check if these topics have high engagement
-        if potential_topics:
-            conn = sqlite3.connect(self.db_path)
+        # 4. Application context relevance
+        app_score = 0.0
+        
+        # Both come from the database; read them in one query
+        if potential_topics or app_name:
+            conn = self._connect()
             cursor = conn.cursor()
-            
-            topic_placeholders = ', '.join(['?'] * len(potential_topics))
-            query = f'''
-            SELECT AVG(access_count) FROM memories 
-            WHERE topics LIKE '%' || ? || '%'
-            '''
-            
-            total_engagement = 0
-            for topic in potential_topics:
-                cursor.execute(query, (topic,))
-                result = cursor.fetchone()
-                if result[0]:
-                    total_engagement += result[0]
-            
-            conn.close()
+            cursor.execute(self._build_relevance_sql(len(potential_topics)), (*potential_topics, app_name))
+            total_engagement, app_memory_count = cursor.fetchone()
+            self._release(conn)
             
             # Normalize historical score
             if potential_topics:
                 avg_engagement = total_engagement / len(potential_topics)
                 historical_score = min(0.3, avg_engagement * 0.1)  # Cap at 0.3
-        
-        # 4. Application context relevance
-        app_score = 0.0
-        if app_name:
-            # Check if this is a frequently used or important app
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-            SELECT COUNT(*) FROM memories WHERE app_name = ?
-            ''', (app_name,))
-            
-            app_memory_count = cursor.fetchone()[0]
-            conn.close()
             
             # More memories from this app suggests it's important
-            app_score = min(0.2, app_memory_count * 0.02)
+            if app_name:
+                app_score = min(0.2, app_memory_count * 0.02)
         
         # Calculate final score with weighted components
         final_score = (rule_score * 0.4) + (interest_score * 0.3) + (historical_score * 0.2) + (app_score * 0.1)
@@ -441,6 +644,11 @@ class SmartMemorySystem:
                 self.processing_queue.task_done()
                 
             except queue.Empty:
+                # Idle: write deferred inserts that have waited long enough
+                since = self._pending_since
+                if since is not None and time.monotonic() - since >= self.PENDING_FLUSH_SECONDS:
+                    self.flush_pending()
+                
                 # Queue is empty, sleep briefly
                 time.sleep(0.1)
             except Exception as e:
@@ -448,14 +656,14 @@ class SmartMemorySystem:
     
     def _maybe_trigger_consolidation(self):
         """Check if consolidation should be triggered"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # Count unconsolidated memories
         cursor.execute('SELECT COUNT(*) FROM memories WHERE is_consolidated = 0')
         unconsolidated_count = cursor.fetchone()[0]
         
-        conn.close()
+        self._release(conn)
         
         # Trigger consolidation if we have enough unconsolidated memories
         if unconsolidated_count >= 10:  # Adjust threshold as needed
@@ -463,7 +671,7 @@ class SmartMemorySystem:
     
     def _consolidate_memories(self, _=None):
         """Consolidate related memories into summaries"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # Get unconsolidated memories
@@ -474,37 +682,56 @@ class SmartMemorySystem:
         ''')
         
         memories = cursor.fetchall()
+        self._release(conn)
         
-        # Group by topic similarity
-        topic_groups = {}
+        # Group memories that share a topic, directly or through other
+        # memories: a union-find over groups, with each topic mapped to the
+        # group it was first seen in
+        parent = []
+        
+        def find(group_id):
+            while parent[group_id] != group_id:
+                parent[group_id] = parent[parent[group_id]]  # Path halving
+                group_id = parent[group_id]
+            return group_id
         
+        topic_to_group = {}
+        members = []
         for memory_id, content, topics_json in memories:
             try:
                 topics = json.loads(topics_json)
-                
-                # Find a matching group or create new
-                assigned = False
-                for group_key, group in topic_groups.items():
-                    group_topics = group["topics"]
-                    # Check for topic overlap
-                    if any(topic in group_topics for topic in topics):
-                        group["memories"].append((memory_id, content))
-                        # Update group topics with any new ones
-                        group["topics"] = list(set(group["topics"] + topics))
-                        assigned = True
-                        break
-                
-                if not assigned:
-                    # Create new group
-                    topic_groups[f"group_{len(topic_groups)}"] = {
-                        "topics": topics,
-                        "memories": [(memory_id, content)]
-                    }
             except json.JSONDecodeError:
                 # Skip memories with invalid topic data
                 continue
-        
-        # For each group with multiple memories, create a consolidated summary
+            
+            roots = {find(topic_to_group[topic]) for topic in topics if topic in topic_to_group}
+            if roots:
+                # Merge every group this memory's topics touch
+                root = min(roots)
+                for other in roots:
+                    parent[other] = root
+            else:
+                # Create new group
+                root = len(parent)
+                parent.append(root)
+            for topic in topics:
+                topic_to_group.setdefault(topic, root)
+            members.append((root, memory_id, content, topics))
+        
+        # Collect each group's memories (still newest first) and topics
+        topic_groups = {}
+        for root, memory_id, content, topics in members:
+            group = topic_groups.setdefault(find(root), {"topics": {}, "memories": []})
+            group["memories"].append((memory_id, content))
+            group["topics"].update(dict.fromkeys(topics))
+        for group in topic_groups.values():
+            group["topics"] = list(group["topics"])
+        
+        # For each group with multiple memories, create a consolidated summary.
+        # Summaries come from the API, so they're all generated before the
+        # write transaction starts rather than while it holds the lock
+        consolidated_rows = []
+        consolidated_ids = []
         for group_key, group in topic_groups.items():
             if len(group["memories"]) >= 3:  # Only consolidate groups with multiple memories
                 memory_ids = [m[0] for m in group["memories"]]
@@ -514,34 +741,37 @@ class SmartMemorySystem:
                 summary = self._generate_summary(memory_contents, group["topics"])
                 
                 if summary:
-                    # Store consolidated memory
-                    cursor.execute('''
-                    INSERT INTO consolidated_memories
-                    (content, source_ids, timestamp, topics)
-                    VALUES (?, ?, ?, ?)
-                    ''', (
+                    consolidated_rows.append((
                         summary,
                         json.dumps(memory_ids),
                         time.time(),
                         json.dumps(group["topics"])
                     ))
-                    
-                    # Mark source memories as consolidated
-                    id_placeholders = ', '.join(['?'] * len(memory_ids))
-                    cursor.execute(f'''
-                    UPDATE memories 
-                    SET is_consolidated = 1
-                    WHERE id IN ({id_placeholders})
-                    ''', memory_ids)
-        
-        conn.commit()
-        conn.close()
+                    consolidated_ids.extend(memory_ids)
+        
+        if consolidated_rows:
+            # Store consolidated memories and mark their sources in one transaction
+            with self._write_connection() as conn:
+                conn.executemany('''
+                INSERT INTO consolidated_memories
+                (content, source_ids, timestamp, topics)
+                VALUES (?, ?, ?, ?)
+                ''', consolidated_rows)
+                
+                conn.execute('''
+                UPDATE memories 
+                SET is_consolidated = 1
+                WHERE id IN (SELECT value FROM json_each(?))
+                ''', (json.dumps(consolidated_ids),))
         
         # After consolidation, update user profile
         self.processing_queue.put(("update_profile", None))
     
     def _generate_summary(self, memory_contents, topics):
         """Generate a summary of related memories using Claude"""
+        if self.claude_client is None:
+            return None
+        
         try:
             all_content = "\n\n---\n\n".join(memory_contents)
             
@@ -573,7 +803,7 @@ class SmartMemorySystem:
     
     def _update_user_profile(self):
         """Update the user's profile based on memory patterns"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # Extract frequent topics (interests)
@@ -590,15 +820,8 @@ class SmartMemorySystem:
             except json.JSONDecodeError:
                 continue
         
-        # Count occurrences of each topic
-        topic_counts = {}
-        for topic in all_topics:
-            topic_counts[topic] = topic_counts.get(topic, 0) + 1
-        
         # Get most frequent topics
-        self.user_interests = [topic for topic, count in sorted(
-            topic_counts.items(), key=lambda x: x[1], reverse=True
-        )[:10]]  # Top 10 interests
+        self.user_interests = [topic for topic, count in Counter(all_topics).most_common(10)]  # Top 10 interests
         
         # Get frequently used apps
         cursor.execute('''
@@ -625,11 +848,11 @@ class SmartMemorySystem:
         ))
         
         conn.commit()
-        conn.close()
+        self._release(conn)
     
     def _load_user_profile(self):
         """Load the user's profile from the database"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute('SELECT interests, common_tasks FROM user_profile WHERE id = 1')
@@ -649,7 +872,7 @@ class SmartMemorySystem:
             self.user_interests = []
             self.common_tasks = []
         
-        conn.close()
+        self._release(conn)
     
     def retrieve_relevant_memories(self, query=None, context=None, app_name=None, limit=5):
         """Retrieve memories relevant to the current context
@@ -663,13 +886,22 @@ class SmartMemorySystem:
         Returns:
             List of relevant memories
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+        conn = self._connect()
         cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row  # Return rows as dictionaries
         
         # Build query based on available information
-        if query:
-            # Direct search query (highest priority)
+        if query and self._fts_available:
+            # Direct search query (highest priority), best bm25 matches first
+            sql = '''
+            SELECT m.* FROM memories_fts
+            JOIN memories m ON m.id = memories_fts.rowid
+            WHERE memories_fts MATCH ?
+            ORDER BY memories_fts.rank
+            LIMIT ?
+            '''
+            cursor.execute(sql, (self._fts_query(query), limit))
+        elif query:
             sql = '''
             SELECT * FROM memories
             WHERE content LIKE ?
@@ -718,7 +950,16 @@ class SmartMemorySystem:
         if len(memories) < limit:
             remaining = limit - len(memories)
             
-            if query:
+            if query and self._fts_available:
+                sql = '''
+                SELECT c.* FROM consolidated_memories_fts
+                JOIN consolidated_memories c ON c.id = consolidated_memories_fts.rowid
+                WHERE consolidated_memories_fts MATCH ?
+                ORDER BY consolidated_memories_fts.rank
+                LIMIT ?
+                '''
+                cursor.execute(sql, (self._fts_query(query), remaining))
+            elif query:
                 sql = '''
                 SELECT * FROM consolidated_memories
                 WHERE content LIKE ?
@@ -754,7 +995,7 @@ class SmartMemorySystem:
                     ''', (time.time(), memory['id']))
         
         conn.commit()
-        conn.close()
+        self._release(conn)
         
         return memories
     
@@ -766,7 +1007,7 @@ class SmartMemorySystem:
         """
         threshold_time = time.time() - (days_threshold * 86400)
         
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # Get count before deletion
@@ -786,13 +1027,14 @@ class SmartMemorySystem:
         ''', (threshold_time,))
         
         conn.commit()
-        conn.close()
+        self._release(conn)
+        self._categories_cache = None
         
         return count_to_delete
     
     def get_memory_stats(self):
         """Get statistics about the memory system"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         stats = {}
@@ -819,19 +1061,15 @@ class SmartMemorySystem:
             except:
                 continue
         
-        topic_counts = {}
-        for topic in all_topics:
-            topic_counts[topic] = topic_counts.get(topic, 0) + 1
+        stats['top_topics'] = Counter(all_topics).most_common(5)
         
-        stats['top_topics'] = sorted(topic_counts.items(), key=lambda x: x[1], reverse=True)[:5]
-        
-        conn.close()
+        self._release(conn)
         return stats
     
     def get_all_topics(self):
         """Get all topics and their memory counts"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             # Get all topics from memories
@@ -843,7 +1081,7 @@ class SmartMemorySystem:
             ''')
             
             results = cursor.fetchall()
-            conn.close()
+            self._release(conn)
             
             # Process the JSON-encoded topics
             topic_counts = {}
@@ -898,9 +1136,9 @@ class SmartMemorySystem:
         Returns:
             List of recent insights
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+        conn = self._connect()
         cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row  # Return rows as dictionaries
         
         # Get recent insights ordered by timestamp
         cursor.execute('''
@@ -920,7 +1158,7 @@ class SmartMemorySystem:
                 except json.JSONDecodeError:
                     insight['topics'] = []
         
-        conn.close()
+        self._release(conn)
         return insights
     
     def get_insight_by_id(self, insight_id):
@@ -932,9 +1170,9 @@ class SmartMemorySystem:
         Returns:
             Insight dictionary or None if not found
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+        conn = self._connect()
         cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row  # Return rows as dictionaries
         
         # Get the insight by ID
         cursor.execute('''
@@ -945,7 +1183,7 @@ class SmartMemorySystem:
         row = cursor.fetchone()
         
         if not row:
-            conn.close()
+            self._release(conn)
             return None
         
         insight = dict(row)
@@ -957,7 +1195,7 @@ class SmartMemorySystem:
             except json.JSONDecodeError:
                 insight['topics'] = []
         
-        conn.close()
+        self._release(conn)
         return insight
     
     def get_all_categories(self):
@@ -966,14 +1204,18 @@ class SmartMemorySystem:
         Returns:
             List of unique categories
         """
-        conn = sqlite3.connect(self.db_path)
+        # Served from cache until a write changes the set of topics
+        if self._categories_cache is not None:
+            return self._categories_cache
+        
+        conn = self._connect()
         cursor = conn.cursor()
         
         # Get all topics from memories
         cursor.execute('SELECT topics FROM memories')
         results = cursor.fetchall()
         
-        conn.close()
+        self._release(conn)
         
         # Extract categories from topics
         categories = set()
@@ -990,7 +1232,15 @@ class SmartMemorySystem:
         # Always include a "General" category
         categories.add("General")
         
-        return sorted(list(categories))
+        self._categories_cache = sorted(categories)
+        return self._categories_cache
+    
+    def _add_categories(self, topics):
+        """Fold newly stored topics into the cached category list, if any"""
+        cached = self._categories_cache
+        if cached is not None and not set(topics).issubset(cached):
+            # Build a new list rather than mutating one callers may hold
+            self._categories_cache = sorted(set(cached).union(topics))
     
     def update_insight_category(self, insight_id, new_category):
         """Update the category of an insight
@@ -1024,7 +1274,7 @@ class SmartMemorySystem:
                 topics.append(new_category)
             
             # Update in database
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -1034,7 +1284,8 @@ class SmartMemorySystem:
             ''', (json.dumps(topics), insight_id))
             
             conn.commit()
-            conn.close()
+            self._release(conn)
+            self._categories_cache = None
             
             return True
         except Exception as e:
@@ -1052,7 +1303,7 @@ class SmartMemorySystem:
             Boolean indicating success
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -1062,7 +1313,7 @@ class SmartMemorySystem:
             ''', (new_content, insight_id))
             
             conn.commit()
-            conn.close()
+            self._release(conn)
             
             return True
         except Exception as e:
@@ -1079,7 +1330,7 @@ class SmartMemorySystem:
             Boolean indicating success
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -1088,13 +1339,89 @@ class SmartMemorySystem:
             ''', (insight_id,))
             
             conn.commit()
-            conn.close()
+            self._release(conn)
+            self._categories_cache = None
             
             return True
         except Exception as e:
             logging.error(f"Error deleting insight: {e}")
             return False
     
+    def _build_filter_sql(self, has_date, has_category):
+        """Get the cached SQL text for get_filtered_insights with the given filters
+        
+        Reusing identical SQL text lets sqlite3's per-connection statement
+        cache skip re-preparing the query.
+        """
+        key = ("insights", has_date, has_category)
+        query = self._stmt_cache.get(key)
+        if query is None:
+            where_clauses = []
+            
+            # Add date filter
+            if has_date:
+                where_clauses.append("timestamp >= ?")
+            
+            # Add category filter: exact match against the topics JSON array,
+            # so e.g. "AI" doesn't also match "Email"
+            if has_category:
+                where_clauses.append(
+                    "json_valid(topics) AND EXISTS (SELECT 1 FROM json_each(memories.topics) WHERE value = ?)"
+                )
+            
+            query = "SELECT * FROM memories"
+            if where_clauses:
+                query += " WHERE " + " AND ".join(where_clauses)
+            query += " ORDER BY timestamp DESC LIMIT ?"
+            self._stmt_cache[key] = query
+        return query
+    
+    def _build_relevance_sql(self, topic_count):
+        """Get the cached SQL text for _calculate_relevance with this many topics
+        
+        Returns one row: the sum over topics of the average access_count of
+        memories whose topics mention it, and the number of memories from
+        the app bound last.
+        """
+        key = ("relevance", topic_count)
+        query = self._stmt_cache.get(key)
+        if query is None:
+            if topic_count:
+                values = ", ".join(["(?)"] * topic_count)
+                engagement = f'''
+                (WITH candidate(topic) AS (VALUES {values})
+                 SELECT TOTAL(avg_count) FROM (
+                     SELECT AVG(m.access_count) AS avg_count
+                     FROM candidate c JOIN memories m ON m.topics LIKE '%' || c.topic || '%'
+                     GROUP BY c.topic
+                 ))'''
+            else:
+                engagement = "0"
+            query = f'''
+            SELECT {engagement},
+                (SELECT COUNT(*) FROM memories WHERE app_name = ?)
+            '''
+            self._stmt_cache[key] = query
+        return query
+    
+    def _build_journal_sql(self, has_mood, has_tag):
+        """Get the cached SQL text for get_journal_entries with the given filters"""
+        key = ("journal", has_mood, has_tag)
+        query = self._stmt_cache.get(key)
+        if query is None:
+            where_clauses = []
+            if has_mood:
+                where_clauses.append("mood = ?")
+            if has_tag:
+                where_clauses.append("tags LIKE ?")
+            
+            query = "SELECT * FROM journal_entries"
+            if where_clauses:
+                query += " WHERE " + " AND ".join(where_clauses)
+            query += " ORDER BY timestamp DESC LIMIT ? OFFSET ?"
+            self._stmt_cache[key] = query
+        return query
+    
     def get_filtered_insights(self, date_range=None, category=None, limit=50):
         """Get insights filtered by date and/or category
         
@@ -1106,33 +1433,20 @@ class SmartMemorySystem:
         Returns:
             List of insights matching the filters
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        conn = self._connect()
         cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
         
-        query = "SELECT * FROM memories"
+        # Bind parameters in the fixed order used by _build_filter_sql
         params = []
-        
-        where_clauses = []
-        
-        # Add date filter
         if date_range:
-            where_clauses.append("timestamp >= ?")
             params.append(date_range)
-        
-        # Add category filter
         if category:
-            where_clauses.append("topics LIKE ?")
-            params.append(f"%{category}%")
-        
-        # Add WHERE clause if we have any filters
-        if where_clauses:
-            query += " WHERE " + " AND ".join(where_clauses)
-        
-        # Add ordering and limit
-        query += " ORDER BY timestamp DESC LIMIT ?"
+            params.append(category)
         params.append(limit)
         
+        query = self._build_filter_sql(bool(date_range), bool(category))
+        
         # Execute query
         cursor.execute(query, params)
         
@@ -1147,7 +1461,7 @@ class SmartMemorySystem:
                 except json.JSONDecodeError:
                     insight['topics'] = []
         
-        conn.close()
+        self._release(conn)
         return insights
     
     def search_memories(self, query, limit=20):
@@ -1163,9 +1477,9 @@ class SmartMemorySystem:
         if not query or len(query) < 3:
             return []
             
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        conn = self._connect()
         cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
         
         # Search in content and context
         cursor.execute('''
@@ -1186,7 +1500,7 @@ class SmartMemorySystem:
                 except json.JSONDecodeError:
                     insight['topics'] = []
         
-        conn.close()
+        self._release(conn)
         return insights
     
     def _calculate_similarity(self, text1, text2):
@@ -1224,39 +1538,36 @@ class SmartMemorySystem:
             ID of the created entry or None if failed
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             current_time = time.time()
             
-            cursor.execute('''
-            INSERT INTO journal_entries (title, content, mood, tags, timestamp, last_modified)
-            VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                title,
-                content,
-                mood,
-                json.dumps(tags) if tags else None,
-                current_time,
-                current_time
-            ))
-            
-            entry_id = cursor.lastrowid
-            
-            # Extract topics from content for context
-            topics = self.extract_topics_local(content)
-            
-            # Store as a memory for context
-            self.store_insight(
-                content=f"Journal Entry: {title}\n{content[:200]}...",
-                source="journal",
-                context=content,
-                app_name="journal",
-                topics=topics
-            )
-            
-            conn.commit()
-            conn.close()
+            # Entry and its companion memory are written in one transaction
+            with self.batch(), self._write_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                INSERT INTO journal_entries (title, content, mood, tags, timestamp, last_modified)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ''', (
+                    title,
+                    content,
+                    mood,
+                    json.dumps(tags) if tags else None,
+                    current_time,
+                    current_time
+                ))
+                
+                entry_id = cursor.lastrowid
+                
+                # Extract topics from content for context
+                topics = self.extract_topics_local(content)
+                
+                # Store as a memory for context
+                self.store_insight(
+                    content=f"Journal Entry: {title}\n{content[:200]}...",
+                    source="journal",
+                    context=content,
+                    app_name="journal",
+                    topics=topics
+                )
             
             return entry_id
         except Exception as e:
@@ -1275,29 +1586,20 @@ class SmartMemorySystem:
         Returns:
             List of journal entries
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        conn = self._connect()
         cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
         
-        query = "SELECT * FROM journal_entries"
+        # Bind parameters in the fixed order used by _build_journal_sql
         params = []
-        
-        where_clauses = []
-        
         if mood:
-            where_clauses.append("mood = ?")
             params.append(mood)
-        
         if tag:
-            where_clauses.append("tags LIKE ?")
             params.append(f"%{tag}%")
-        
-        if where_clauses:
-            query += " WHERE " + " AND ".join(where_clauses)
-        
-        query += " ORDER BY timestamp DESC LIMIT ? OFFSET ?"
         params.extend([limit, offset])
         
+        query = self._build_journal_sql(bool(mood), bool(tag))
+        
         cursor.execute(query, params)
         
         entries = [dict(row) for row in cursor.fetchall()]
@@ -1310,7 +1612,7 @@ class SmartMemorySystem:
                 except json.JSONDecodeError:
                     entry['tags'] = []
         
-        conn.close()
+        self._release(conn)
         return entries
     
     def get_journal_entry(self, entry_id):
@@ -1322,9 +1624,9 @@ class SmartMemorySystem:
         Returns:
             Journal entry dictionary or None if not found
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        conn = self._connect()
         cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
         
         cursor.execute('''
         SELECT * FROM journal_entries
@@ -1334,7 +1636,7 @@ class SmartMemorySystem:
         row = cursor.fetchone()
         
         if not row:
-            conn.close()
+            self._release(conn)
             return None
         
         entry = dict(row)
@@ -1346,7 +1648,7 @@ class SmartMemorySystem:
             except json.JSONDecodeError:
                 entry['tags'] = []
         
-        conn.close()
+        self._release(conn)
         return entry
     
     def update_journal_entry(self, entry_id, title=None, content=None, mood=None, tags=None):
@@ -1396,7 +1698,7 @@ class SmartMemorySystem:
             
             params.append(entry_id)
             
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute(f'''
@@ -1406,7 +1708,7 @@ class SmartMemorySystem:
             ''', params)
             
             conn.commit()
-            conn.close()
+            self._release(conn)
             
             return True
         except Exception as e:
@@ -1423,7 +1725,7 @@ class SmartMemorySystem:
             Boolean indicating success
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -1432,7 +1734,7 @@ class SmartMemorySystem:
             ''', (entry_id,))
             
             conn.commit()
-            conn.close()
+            self._release(conn)
             
             return True
         except Exception as e:
@@ -1446,7 +1748,7 @@ class SmartMemorySystem:
             Dictionary containing journal statistics
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             # Get total number of entries
@@ -1470,7 +1772,7 @@ class SmartMemorySystem:
             
             tag_counts = Counter(all_tags).most_common(10)
             
-            conn.close()
+            self._release(conn)
             
             return {
                 'total_entries': total_entries,
@@ -1,22 +1,46 @@
 import mss
 import mss.tools
 import pytesseract
-import io
 from PIL import Image, ImageEnhance, ImageFilter
 import time
 import os
 import platform
 import logging
-import base64
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from screen_diff import tile_hashes, tile_change_fraction
+
+OCR_CONFIG = r'--oem 3 --psm 6 -l eng'
+
+def _init_ocr_worker():
+    """Configure Tesseract once when the OCR worker process starts"""
+    # Configure Tesseract path for Windows
+    if platform.system() == "Windows":
+        pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+
+def _ocr_worker(mode, size, data):
+    """Preprocess a raw image and extract its text (runs in the OCR worker process)"""
+    image = Image.frombytes(mode, size, data)
+    
+    # Add preprocessing for better OCR results
+    # Enhance contrast
+    enhancer = ImageEnhance.Contrast(image)
+    image = enhancer.enhance(1.5)
+    
+    # Apply sharpening
+    image = image.filter(ImageFilter.SHARPEN)
+    
+    # Use better OCR configuration
+    return pytesseract.image_to_string(image, config=OCR_CONFIG)
 
 class ScreenCapture:
     def __init__(self):
         """Initialize screen capture with platform-specific settings"""
         self.sct = mss.mss()
         
-        # Configure Tesseract path for Windows
-        if platform.system() == "Windows":
-            pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+        # Single long-lived worker process for OCR so Tesseract and the image
+        # preprocessing don't block the calling thread or hold the GIL
+        self._ocr_pool = ProcessPoolExecutor(max_workers=1, initializer=_init_ocr_worker)
+        self.ocr_timeout = 10  # seconds
         
         # Configure logging
         logging.basicConfig(level=logging.INFO)
@@ -36,18 +60,17 @@ class ScreenCapture:
     def extract_text(self, image):
         """Extract text with improved OCR settings"""
         try:
-            # Add preprocessing for better OCR results
-            # Enhance contrast
-            enhancer = ImageEnhance.Contrast(image)
-            image = enhancer.enhance(1.5)
+            # OCR only needs luminance, so convert to grayscale first; that
+            # cuts the pixel data shipped to the worker and preprocessed to a third
+            if image.mode != "L":
+                image = image.convert("L")
             
-            # Apply sharpening
-            image = image.filter(ImageFilter.SHARPEN)
-            
-            # Use better OCR configuration
-            custom_config = r'--oem 3 --psm 6 -l eng'
-            text = pytesseract.image_to_string(image, config=custom_config)
-            return text
+            # Ship raw pixels to the worker process; cheaper than re-encoding
+            future = self._ocr_pool.submit(_ocr_worker, image.mode, image.size, image.tobytes())
+            return future.result(timeout=self.ocr_timeout)
+        except FutureTimeoutError:
+            self.logger.error(f"OCR timed out after {self.ocr_timeout} seconds")
+            return ""
         except Exception as e:
             self.logger.error(f"Error extracting text: {e}")
             return ""
@@ -75,8 +98,13 @@ class ScreenCapture:
             img = Image.frombytes("RGB", screenshot.size, screenshot.bgra, "raw", "BGRX")
             return img
 
-    def analyze_screen(self):
-        """Capture and analyze the current screen content"""
+    def analyze_screen(self, previous_tile_hashes=None, change_threshold=0.1):
+        """Capture and analyze the current screen content
+        
+        If previous_tile_hashes is given and no more than change_threshold of
+        the screen's tiles differ from it, OCR is skipped: the result has
+        "unchanged" set and "text" is None.
+        """
         try:
             # Capture the primary monitor
             screenshot = self.sct.grab(self.sct.monitors[1])
@@ -84,20 +112,29 @@ class ScreenCapture:
             # Convert to PIL Image
             img = Image.frombytes('RGB', screenshot.size, screenshot.rgb)
             
-            # Extract text
-            text = self.extract_text(img)
+            # Hashing the pixels is far cheaper than OCR, so decide first
+            # whether the screen changed enough to be worth reading
+            hashes = tile_hashes(img)
+            unchanged = (previous_tile_hashes is not None
+                         and tile_change_fraction(previous_tile_hashes, hashes) <= change_threshold)
             
-            # Convert image to base64 for storage
-            buffered = io.BytesIO()
-            img.save(buffered, format="PNG")
-            img_str = base64.b64encode(buffered.getvalue()).decode()
+            # Extract text
+            text = None if unchanged else self.extract_text(img)
             
+            # Keep the image as-is; only text is sent to Claude, so callers that
+            # need to store or upload it can encode it themselves
             return {
                 "text": text,
-                "image": img_str,
+                "image": img,
+                "tile_hashes": hashes,
+                "unchanged": unchanged,
                 "timestamp": time.time()
             }
             
         except Exception as e:
             self.logger.error(f"Error analyzing screen: {e}")
-            return None 
\ No newline at end of file
+            return None
+    
+    def shutdown(self):
+        """Stop the OCR worker process"""
+        self._ocr_pool.shutdown(wait=False)
@@ -0,0 +1,169 @@
+import re
+import zlib
+import hashlib
+from difflib import SequenceMatcher
+
+try:
+    from rapidfuzz.distance import Indel
+except ImportError:  # Fall back to the much slower pure-Python difflib
+    Indel = None
+
+# Characters of screen text kept for the "content changed?" comparison
+SIMILARITY_WINDOW = 4096
+
+# Length of the byte shingles used to fingerprint screen text
+SHINGLE_SIZE = 8
+
+# Jaccard similarities in this band are too close to call from shingles alone
+# and are re-checked with an edit-distance ratio on a bounded prefix. RapidFuzz
+# is fast enough to look at the whole similarity window; difflib is not
+BORDERLINE_SIMILARITY = (0.85, 0.92)
+SEQUENCE_MATCH_WINDOW = 4096 if Indel is not None else 1024
+
+# Screenshots are split into a TILE_GRID x TILE_GRID grid of tiles for hashing
+TILE_GRID = 8
+
+# Byte translation table that folds ASCII case and turns punctuation and
+# control bytes into spaces, so OCR jitter doesn't change the fingerprint
+_FINGERPRINT_TABLE = bytes(
+    c + 32 if 65 <= c <= 90
+    else c if 48 <= c <= 57 or 97 <= c <= 122 or c >= 128
+    else 32
+    for c in range(256)
+)
+
+# Runs of whitespace, collapsed by normalize_whitespace
+_WS_RE = re.compile(r"\s+")
+
+def normalize_whitespace(text):
+    """Collapse whitespace runs to single spaces and strip the ends
+    
+    Applied once to OCR output so the change checks, the response cache and
+    Claude all see the same text.
+    """
+    return _WS_RE.sub(" ", text).strip()
+
+# Byte range counted as "text" by text_ratio ('0' through 'z')
+_TEXT_BYTES = bytes(range(48, 123))
+
+def text_ratio(text):
+    """Fraction of the UTF-8 bytes of text that are ASCII letters or digits (0.0-1.0)
+    
+    Cheap heuristic for spotting screens that are mostly whitespace,
+    symbols or OCR noise.
+    """
+    data = text.encode("utf-8", "ignore")
+    if not data:
+        return 0.0
+    # translate() with a delete set strips the text bytes in C; what's left is noise
+    return 1 - len(data.translate(None, _TEXT_BYTES)) / len(data)
+
+def normalize_for_fingerprint(text):
+    """Normalize text to case-folded, single-spaced UTF-8 bytes"""
+    data = text.encode("utf-8", "ignore").translate(_FINGERPRINT_TABLE)
+    return b" ".join(data.split())
+
+def text_fingerprint(data):
+    """Fingerprint normalized bytes as the set of hashes of their overlapping shingles"""
+    if len(data) < SHINGLE_SIZE:
+        return frozenset((hash(data),))
+    return frozenset(hash(data[i:i + SHINGLE_SIZE]) for i in range(len(data) - SHINGLE_SIZE + 1))
+
+def fingerprint_similarity(a, b):
+    """Jaccard similarity of two fingerprints (0.0-1.0)"""
+    common = len(a & b)
+    total = len(a) + len(b) - common
+    return common / total if total else 1.0
+
+def tile_hashes(image, grid=TILE_GRID):
+    """Hash a PIL image as a grid of tiles, row by row
+    
+    Returns:
+        List of grid * grid CRC32 values, one per tile
+    """
+    width, height = image.size
+    hashes = []
+    for row in range(grid):
+        top, bottom = height * row // grid, height * (row + 1) // grid
+        for col in range(grid):
+            left, right = width * col // grid, width * (col + 1) // grid
+            hashes.append(zlib.crc32(image.crop((left, top, right, bottom)).tobytes()))
+    return hashes
+
+def tile_change_fraction(previous, current):
+    """Fraction of tiles that differ between two tile_hashes() results (0.0-1.0)"""
+    if not previous or len(previous) != len(current):
+        return 1.0
+    return sum(a != b for a, b in zip(previous, current)) / len(current)
+
+def sequence_ratio(a, b):
+    """Similarity ratio of two strings or byte strings, between 0 and 1
+    
+    Same measure as difflib.SequenceMatcher.ratio(), computed by RapidFuzz
+    when it is installed.
+    """
+    if Indel is not None:
+        return Indel.normalized_similarity(a, b)
+    return SequenceMatcher(None, a, b).ratio()
+
+
+class ScreenDiff:
+    def __init__(self, threshold=0.9, window=SIMILARITY_WINDOW):
+        """Track the last analyzed screen text to detect meaningful changes
+        
+        Args:
+            threshold: Similarity above which text counts as unchanged
+            window: Number of trailing characters compared
+        """
+        self.threshold = threshold
+        self.window = window
+        
+        # Only the length, fingerprint and a short prefix are kept, never
+        # the full text
+        self.last_length = 0
+        self.last_fingerprint = None
+        self.last_prefix = b""
+        
+        # (length, digest) of the raw text seen on the previous call
+        self.last_exact = None
+    
+    def is_unchanged(self, text):
+        """Check text against the last recorded screen
+        
+        Changed text becomes the new reference. Unchanged text does not, so
+        slow drift is still measured against the last analyzed screen.
+        
+        Returns:
+            True if text is too similar to the last screen to re-analyze
+        """
+        # Byte-identical to the previous call (the steady idle case): no need
+        # to normalize or fingerprint anything
+        exact = (len(text), hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=8).digest())
+        if exact == self.last_exact:
+            return True
+        self.last_exact = exact
+        
+        normalized = normalize_for_fingerprint(text[-self.window:])
+        fingerprint = text_fingerprint(normalized)
+        
+        # A length change of more than 10% always counts as changed
+        longest = max(len(normalized), self.last_length)
+        prefix = normalized[:SEQUENCE_MATCH_WINDOW]
+        if (self.last_fingerprint is not None
+                and abs(len(normalized) - self.last_length) <= 0.1 * longest
+                and self._similar(fingerprint, prefix)):
+            return True
+        
+        self.last_length = len(normalized)
+        self.last_fingerprint = fingerprint
+        self.last_prefix = prefix
+        return False
+    
+    def _similar(self, fingerprint, prefix):
+        """Compare against the last screen, using sequence_ratio only for borderline cases"""
+        similarity = fingerprint_similarity(self.last_fingerprint, fingerprint)
+        low, high = BORDERLINE_SIMILARITY
+        if low <= similarity <= high:
+            return sequence_ratio(self.last_prefix, prefix) > self.threshold
+        return similarity > self.threshold
+